@@ -1,9 +1,26 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import pydeck as pdk
 from pathlib import Path
+import bisect
+import collections
+import contextlib
+import copy
 import datetime
+import functools
+import hashlib
+import html
+import itertools
+import json
 import math
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from sources import ingest, source_paths
 
 # ============================================================
 # 0. CONFIG
@@ -15,10 +32,15 @@ st.set_page_config(
 )
 
 BASE_DIR = Path(__file__).parent
-FPL_CSV = BASE_DIR / "fpl database.csv"
-UPTD_XLSX = BASE_DIR / "Data UPTD PPA_2025 (1).xlsx"
-SUGGEST_PATH = BASE_DIR / "edit_suggestions.csv"
+SUGGEST_PATH = BASE_DIR / "edit_suggestions.csv"  # format lama, diimpor sekali ke SUGGEST_DB
+SUGGEST_DB = BASE_DIR / "edit_suggestions.db"
 FPL_LOGO_PATH = BASE_DIR / "fpl_logo.png"  # opsional, abaikan jika belum ada file
+PAGE_SIZE_OPTIONS = [10, 20, 50, 100]
+ADMIN_PAGE_SIZE = 20  # usulan per halaman di antrean admin
+SNAPSHOT_DIR = BASE_DIR / ".snapshot"  # cache Parquet hasil gabungan, aman dihapus
+SNAPSHOT_SCHEMA = 5  # naikkan jika logika load/kategori/geocoding berubah
+GAZETTEER_PATH = BASE_DIR / "gazetteer_wilayah.csv"  # titik provinsi & kab/kota (offline)
+RELOAD_CHECK_SECONDS = 5  # interval cek perubahan file sumber (hot reload)
 
 
 # ============================================================
@@ -138,7 +160,39 @@ def get_source_badge_html(source_raw: str) -> str:
     else:
         css_class = "source-badge source-other"
 
-    return f'<span class="{css_class}">{source}</span>'
+    return f'<span class="{css_class}">{html.escape(source)}</span>'
+
+
+def build_card_html(row: dict) -> str:
+    """HTML card satu lembaga (teks sudah di-escape)."""
+    nama = html.escape(safe_str(row.get("Nama Organisasi", "")))
+    alamat = safe_str(row.get("Alamat Organisasi", ""))
+    kontak = html.escape(safe_str(row.get("Kontak Lembaga/Layanan", "")))
+    email = html.escape(safe_str(row.get("Email Lembaga", "")))
+    kategori_list = row.get("kategori_layanan", ()) or ()
+    badge_html = row.get("badge_html") or get_source_badge_html(row.get("Sumber Data", ""))
+
+    alamat_disp = html.escape(alamat if len(alamat) <= 200 else alamat[:200] + "…")
+    tags_html = "".join(
+        f'<span class="tag">{html.escape(cat)}</span>' for cat in kategori_list
+    ) or '<span class="tag">Not specified</span>'
+
+    return (
+        '<div class="org-card">'
+        '<div style="display:flex; justify-content:space-between; '
+        'align-items:flex-start; gap:0.5rem;">'
+        f'<div class="org-name">{nama}</div>'
+        f"<div>{badge_html}</div>"
+        "</div>"
+        f'<div class="org-address">{alamat_disp}</div>'
+        '<div class="org-meta"><span class="label">Service Contact:</span> '
+        f"{kontak or '-'}</div>"
+        '<div class="org-meta"><span class="label">Service Email:</span> '
+        f"{email or '-'}</div>"
+        '<div class="org-meta"><span class="label">Service Categories:</span><br/>'
+        f"{tags_html}</div>"
+        "</div>"
+    )
 
 
 # ============================================================
@@ -166,63 +220,360 @@ KATEGORI_DEFS = {
 }
 
 
-def _extract_kategori(text: str) -> list[str]:
-    text_l = (text or "").lower()
-    hasil = set()
-    for kat, keywords in KATEGORI_DEFS.items():
-        if not keywords:
-            continue
-        if any(kw in text_l for kw in keywords):
-            hasil.add(kat)
-    if not hasil:
-        hasil.add("Lainnya")
-    return sorted(hasil)
+# Bit per kategori (urutan KATEGORI_DEFS) untuk kolom bitmask `kategori_mask`.
+KATEGORI_BITS = {kat: 1 << i for i, kat in enumerate(KATEGORI_DEFS)}
+KATEGORI_SORTED = sorted(KATEGORI_DEFS)
+
+
+def kategori_to_mask(kategori) -> int:
+    mask = 0
+    for kat in kategori:
+        mask |= KATEGORI_BITS.get(kat, 0)
+    return mask
+
+
+@functools.lru_cache(maxsize=None)
+def mask_to_kategori(mask: int) -> tuple:
+    """Kebalikan `kategori_to_mask`; nama kategori urut alfabet."""
+    return tuple(kat for kat in KATEGORI_SORTED if mask & KATEGORI_BITS[kat])
+
+
+# ------------------------------------------------------------
+# Kategorisasi satu kolom sekaligus: semua keyword dikompilasi jadi satu
+# regex, teks digabung jadi satu string, lalu di-scan sekali. Hasil per
+# (kategori, teks) disimpan di memo persisten agar teks yang sama tidak
+# dikategorikan ulang setelah update data / taksonomi.
+# ------------------------------------------------------------
+KATEGORI_MEMO_PATH = SNAPSHOT_DIR / "kategori_memo.json"
+
+
+class KategoriMatcher:
+    """Multi-keyword matcher untuk sebagian/seluruh KATEGORI_DEFS."""
+
+    def __init__(self, defs: dict):
+        keywords = sorted(
+            {kw.lower() for kws in defs.values() for kw in kws}, key=len, reverse=True
+        )
+        # Regex hanya melaporkan keyword terpanjang per posisi; keyword lain yang
+        # muncul di posisi itu pasti substring-nya, jadi kategorinya ikut dibawa.
+        self._hits = {
+            kw: functools.reduce(
+                int.__or__,
+                (
+                    KATEGORI_BITS[kat]
+                    for kat, kws in defs.items()
+                    if any(other.lower() in kw for other in kws)
+                ),
+                0,
+            )
+            for kw in keywords
+        }
+        self._regex = (
+            re.compile("(?=(" + "|".join(map(re.escape, keywords)) + "))")
+            if keywords
+            else None
+        )
+
+    def match_column(self, texts: list) -> list:
+        """Bitmask kategori (tanpa "Lainnya") untuk setiap teks."""
+        masks = [0] * len(texts)
+        if self._regex is None or not texts:
+            return masks
+        lowered = [t.lower() for t in texts]
+        # posisi awal tiap teks di blob; \x00 tidak ada di keyword mana pun
+        starts = list(itertools.accumulate((len(t) + 1 for t in lowered[:-1]), initial=0))
+        blob = "\x00".join(lowered)
+        for m in self._regex.finditer(blob):
+            row = bisect.bisect_right(starts, m.start()) - 1
+            masks[row] |= self._hits[m.group(1)]
+        return masks
+
+
+def _kategori_signature(kat: str) -> str:
+    keywords = sorted(kw.lower() for kw in KATEGORI_DEFS[kat])
+    return hashlib.sha1(json.dumps([kat, keywords]).encode()).hexdigest()[:12]
+
+
+def _load_kategori_memo() -> dict:
+    """Memo: {hash teks: (bit hit, bit sudah dievaluasi)} dalam urutan bit saat ini.
+
+    Kategori yang keyword-nya berubah/baru dianggap belum dievaluasi.
+    """
+    try:
+        raw = json.loads(KATEGORI_MEMO_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+    current = {_kategori_signature(kat): bit for kat, bit in KATEGORI_BITS.items()}
+    remap = [
+        (1 << i, current[sig]) for i, sig in enumerate(raw.get("sigs", [])) if sig in current
+    ]
+    memo = {}
+    for text_hash, (hit, evaluated) in raw.get("entries", {}).items():
+        new_hit = new_eval = 0
+        for old_bit, new_bit in remap:
+            if evaluated & old_bit:
+                new_eval |= new_bit
+                if hit & old_bit:
+                    new_hit |= new_bit
+        if new_eval:
+            memo[text_hash] = (new_hit, new_eval)
+    return memo
+
+
+def _save_kategori_memo(memo: dict):
+    try:
+        SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "sigs": [_kategori_signature(kat) for kat in KATEGORI_DEFS],
+            "entries": memo,
+        }
+        tmp = KATEGORI_MEMO_PATH.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(tmp, KATEGORI_MEMO_PATH)
+    except Exception:
+        pass  # memo hanya optimasi
+
+
+def categorize_texts(texts) -> np.ndarray:
+    """Bitmask kategori per teks (bit "Lainnya" kalau tidak ada yang cocok)."""
+    texts = list(texts)
+    keyword_bits = {kat: bit for kat, bit in KATEGORI_BITS.items() if KATEGORI_DEFS[kat]}
+    all_keyword_bits = functools.reduce(int.__or__, keyword_bits.values(), 0)
+
+    memo = _load_kategori_memo()
+    hashes = [hashlib.blake2b(t.lower().encode(), digest_size=8).hexdigest() for t in texts]
+
+    # Kelompokkan teks unik menurut kategori yang belum dievaluasi untuknya
+    pending = {}
+    for text, text_hash in dict(zip(texts, hashes)).items():
+        evaluated = memo.get(text_hash, (0, 0))[1]
+        need = all_keyword_bits & ~evaluated
+        if need:
+            pending.setdefault(need, {})[text_hash] = text
+
+    for need, by_hash in pending.items():
+        defs = {kat: KATEGORI_DEFS[kat] for kat, bit in keyword_bits.items() if need & bit}
+        found = KategoriMatcher(defs).match_column(list(by_hash.values()))
+        for text_hash, hit in zip(by_hash, found):
+            old_hit, old_eval = memo.get(text_hash, (0, 0))
+            memo[text_hash] = (old_hit | hit, old_eval | need)
+    if pending:
+        _save_kategori_memo(memo)
+
+    lainnya = KATEGORI_BITS.get("Lainnya", 0)
+    out = np.empty(len(texts), dtype=np.uint32)
+    for i, text_hash in enumerate(hashes):
+        hit = memo[text_hash][0] & all_keyword_bits if text_hash in memo else 0
+        out[i] = hit or lainnya
+    return out
 
 
 # ============================================================
-# 3. LOAD DATA FPL & UPTD
+# 3. LOAD DATA FPL & UPTD (loader per sumber ada di sources.py)
 # ============================================================
-def _read_excel_safe(path: Path, sheet_name: str):
-    """Coba baca Excel; kalau gagal (engine, dll.) → None, dengan warning."""
-    if not path.exists():
+TEXT_COLUMNS = [
+    "Nama Organisasi",
+    "Alamat Organisasi",
+    "Kontak Lembaga/Layanan",
+    "Email Lembaga",
+    "Profil Organisasi",
+    "Layanan Yang Diberikan",
+    "Provinsi",
+    "Kabupaten/Kota",
+]
+LIST_COLUMNS = ["layanan_list", "kategori_layanan"]
+
+
+# ------------------------------------------------------------
+# Geocoding offline: baris tanpa koordinat diberi titik ibu kota provinsi /
+# pusat pemerintahan kab/kota dari gazetteer lokal (tanpa akses jaringan).
+# Hasil di-cache per alamat ternormalisasi, jadi data baru hanya
+# men-geocode alamat yang baru atau berubah.
+# ------------------------------------------------------------
+GEOCODE_CACHE_PATH = SNAPSHOT_DIR / "geocode_cache.json"
+PRESISI_KOORDINAT = {
+    "sumber": "Dari file sumber",
+    "kabkota": "Perkiraan: pusat kabupaten/kota",
+    "provinsi": "Perkiraan: ibu kota provinsi",
+    "koreksi": "Koreksi yang disetujui admin",
+}
+
+
+def _wilayah_words(text) -> list:
+    t = re.sub(r"[^a-z0-9]+", " ", safe_str(text).lower())
+    t = re.sub(r"\bkep\b", "kepulauan", t)
+    t = re.sub(r"\bsumatra\b", "sumatera", t)
+    return t.split()
+
+
+def _wilayah_key(text) -> str:
+    """Kunci nama provinsi: huruf kecil, tanpa tanda baca, spasi & kata "provinsi"."""
+    words = _wilayah_words(text)
+    if words[:1] in (["provinsi"], ["prov"]):
+        words = words[1:]
+    return "".join(words)
+
+
+def _kabkota_keys(text) -> list:
+    """[(tingkat | None, kunci)] untuk nama kab/kota, dari tafsiran paling spesifik."""
+    words = _wilayah_words(text)
+    keys = []
+    if len(words) > 1 and words[0] in ("kota", "kabupaten", "kab"):
+        keys.append(("kota" if words[0] == "kota" else "kabupaten", "".join(words[1:])))
+    keys.append((None, "".join(words)))  # mis. "Kota Waringin Barat" = Kab. Kotawaringin Barat
+    return keys
+
+
+class Gazetteer:
+    """Titik provinsi & kab/kota dari `gazetteer_wilayah.csv`.
+
+    Nama tanpa awalan "Kota"/"Kabupaten" dicocokkan ke kabupaten dulu, lalu kota
+    (sesuai penulisan di data UPTD).
+    """
+
+    def __init__(self, path: Path):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        self.provinces = {}  # kunci provinsi (nama resmi) → (lat, lon)
+        self._prov_alias = {}  # kunci nama/alias provinsi → kunci nama resmi
+        self._kabkota = {}  # (tingkat, kunci nama) → [(kunci provinsi, lat, lon)]
+        for r in df.itertuples(index=False):
+            point = (float(r.latitude), float(r.longitude))
+            names = [r.nama, *(a for a in r.alias.split(";") if a.strip())]
+            if r.tingkat == "provinsi":
+                self.provinces[_wilayah_key(r.nama)] = point
+                for name in names:
+                    self._prov_alias[_wilayah_key(name)] = _wilayah_key(r.nama)
+            else:
+                prov = _wilayah_key(r.provinsi)
+                for name in names:
+                    key = "".join(_wilayah_words(name))
+                    self._kabkota.setdefault((r.tingkat, key), []).append((prov, *point))
+
+    def province(self, text):
+        """Kunci resmi provinsi untuk nama/alias `text`; None kalau tidak dikenal."""
+        return self._prov_alias.get(_wilayah_key(text))
+
+    def kabkota(self, text, prov_key=None):
+        for tingkat, key in _kabkota_keys(text):
+            for t in (tingkat,) if tingkat else ("kabupaten", "kota"):
+                hits = self._kabkota.get((t, key), [])
+                if prov_key:
+                    hits = [h for h in hits if h[0] == prov_key]
+                if hits:
+                    return hits[0][1:]
         return None
+
+    def locate(self, provinsi="", kabkota="", alamat=""):
+        """(lat, lon, presisi) untuk satu baris; presisi "kabkota" / "provinsi" / ""."""
+        prov_key = self.province(provinsi)
+        if kabkota:
+            point = self.kabkota(kabkota, prov_key)
+            if point:
+                return (*point, "kabkota")
+
+        # Alamat bebas: "..., Kecamatan, Kab/Kota, Provinsi" → cari dari belakang
+        parts = [
+            [w for w in _wilayah_words(p) if not w.isdigit() and w != "indonesia"]
+            for p in re.split(r"[,\n]", safe_str(alamat))
+        ]
+        parts = [p for p in parts if p][-5:]
+        # Nama provinsi di ujung alamat dibuang supaya tidak menutupi kab/kota;
+        # alamat utuh tetap dicoba sesudahnya ("Kota Jambi, Jambi", "Bandar Lampung")
+        candidates = [parts]
+        for j in range(len(parts) - 1, max(len(parts) - 3, -1), -1):
+            found = None
+            for n in range(min(4, len(parts[j])), 0, -1):
+                key = self.province(" ".join(parts[j][-n:]))
+                if key and key == (prov_key or key):
+                    found = (n, key)
+                    break
+            if found:
+                n, prov_key = found
+                candidates.insert(0, parts[:j] + ([parts[j][:-n]] if parts[j][:-n] else []))
+                break
+        for cand in candidates:
+            for words in reversed(cand[-3:]):
+                for n in range(min(4, len(words)), 0, -1):
+                    point = self.kabkota(" ".join(words[-n:]), prov_key)
+                    if point:
+                        return (*point, "kabkota")
+
+        if prov_key:
+            return (*self.provinces[prov_key], "provinsi")
+        return (np.nan, np.nan, "")
+
+
+@functools.lru_cache(maxsize=1)
+def _load_gazetteer(file_hash: str):
+    """Gazetteer untuk isi file tertentu (hash sebagai kunci cache); None kalau tidak ada."""
     try:
-        return pd.read_excel(
-            path,
-            sheet_name=sheet_name,
-            header=None,
-            engine="openpyxl",
-        )
-    except ImportError:
-        st.warning(
-            f"Tidak dapat membaca '{path.name}' (openpyxl belum diinstall). "
-            "Data UPTD akan dilewati sampai dependensi terpasang."
-        )
-        return None
-    except Exception as e:
-        st.warning(
-            f"Gagal membaca sheet '{sheet_name}' dari '{path.name}': {e}. "
-            "Data UPTD akan dilewati."
-        )
+        return Gazetteer(GAZETTEER_PATH)
+    except Exception:
         return None
 
 
-def load_fpl() -> pd.DataFrame:
-    if not FPL_CSV.exists():
-        return pd.DataFrame()
+def _geocode_cache_key(provinsi, kabkota, alamat) -> str:
+    norm = "\x1f".join(" ".join(_wilayah_words(v)) for v in (provinsi, kabkota, alamat))
+    return hashlib.blake2b(norm.encode(), digest_size=8).hexdigest()
 
-    df = pd.read_csv(FPL_CSV, sep=";", engine="python")
 
-    if "Kontak Lembaga/\nKontak Layanan" in df.columns:
-        df = df.rename(
-            columns={"Kontak Lembaga/\nKontak Layanan": "Kontak Lembaga/Layanan"}
-        )
+def _load_geocode_cache(gazetteer_hash: str) -> dict:
+    """Cache {kunci alamat: [lat, lon, presisi]}; dibuang kalau gazetteer berubah."""
+    try:
+        raw = json.loads(GEOCODE_CACHE_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    return raw.get("entries", {}) if raw.get("gazetteer") == gazetteer_hash else {}
 
-    df = df.drop(columns=[c for c in df.columns if c.startswith("Unnamed")], errors="ignore")
 
-    df["Sumber Data"] = "Jaringan FPL"
-    df["Latitude"] = np.nan
-    df["Longitude"] = np.nan
+def _save_geocode_cache(gazetteer_hash: str, entries: dict):
+    try:
+        SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = GEOCODE_CACHE_PATH.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"gazetteer": gazetteer_hash, "entries": entries}), encoding="utf-8")
+        os.replace(tmp, GEOCODE_CACHE_PATH)
+    except Exception:
+        pass  # cache hanya optimasi
+
+
+def geocode_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Isi Latitude/Longitude yang kosong dari gazetteer + kolom `presisi_koordinat`."""
+    lat = pd.to_numeric(df["Latitude"], errors="coerce")
+    lon = pd.to_numeric(df["Longitude"], errors="coerce")
+    has_coord = lat.notna() & lon.notna()
+    presisi = np.where(has_coord, "sumber", "").astype(object)
+
+    gazetteer_hash = _file_hash(GAZETTEER_PATH)
+    gazetteer = _load_gazetteer(gazetteer_hash)
+    missing = np.flatnonzero(~has_coord.to_numpy())
+    if gazetteer is not None and len(missing):
+        cache = _load_geocode_cache(gazetteer_hash)
+        fields = df[["Provinsi", "Kabupaten/Kota", "Alamat Organisasi"]].to_numpy()
+        lat, lon = lat.to_numpy(copy=True), lon.to_numpy(copy=True)
+        n_new = 0
+        for i in missing:
+            key = _geocode_cache_key(*fields[i])
+            if key not in cache:
+                cache[key] = list(gazetteer.locate(*(safe_str(v) for v in fields[i])))
+                n_new += 1
+            lat[i], lon[i], presisi[i] = cache[key]
+        if n_new:
+            _save_geocode_cache(gazetteer_hash, cache)
+        df["Latitude"], df["Longitude"] = lat, lon
+
+    df["presisi_koordinat"] = presisi
+    return df
+
+
+def _split_layanan(text: str) -> list:
+    return [p.strip() for p in text.split(";") if p.strip()]
+
+
+def _prepare_source_frame(frame: pd.DataFrame, source_file: str) -> pd.DataFrame:
+    """Baris dari satu file sumber + kolom turunan (layanan_list, kategori_layanan)."""
+    df = frame.copy()
+    df["sumber_file"] = source_file
 
     for col in [
         "Nama Organisasi",
@@ -231,205 +582,2272 @@ def load_fpl() -> pd.DataFrame:
         "Email Lembaga",
         "Profil Organisasi",
         "Layanan Yang Diberikan",
+        "Sumber Data",
+        "Latitude",
+        "Longitude",
+        "Provinsi",
+        "Kabupaten/Kota",
     ]:
         if col not in df.columns:
             df[col] = ""
 
-    return df[
-        [
-            "Nama Organisasi",
-            "Alamat Organisasi",
-            "Kontak Lembaga/Layanan",
-            "Email Lembaga",
-            "Profil Organisasi",
-            "Layanan Yang Diberikan",
-            "Sumber Data",
-            "Latitude",
-            "Longitude",
+    raw_text = (
+        df["Layanan Yang Diberikan"]
+        .fillna("")
+        .astype(str)
+        .str.replace("\n", " ")
+    )
+
+    df["layanan_list"] = raw_text.apply(_split_layanan)
+    df["kategori_layanan"] = [
+        list(mask_to_kategori(int(m))) for m in categorize_texts(raw_text)
+    ]
+
+    # Kolom teks dari Excel bisa campuran int/str (mis. nomor telepon);
+    # samakan jadi str supaya bisa disimpan ke Parquet. NaN tetap NaN.
+    for col in TEXT_COLUMNS:
+        df[col] = df[col].map(
+            lambda v: v if isinstance(v, str) or pd.isna(v) else str(v)
+        ).astype(object)
+
+    return geocode_frame(df)
+
+
+# ------------------------------------------------------------
+# Hash file sumber & snapshot Parquet: hasil gabungan disimpan per versi
+# (hash isi semua file sumber), sehingga parser CSV/Excel hanya jalan
+# kalau ada file sumber yang berubah.
+# ------------------------------------------------------------
+def _source_file_id(path: Path) -> str:
+    """Nama file sumber relatif terhadap folder app (isi kolom `sumber_file`)."""
+    try:
+        return path.relative_to(BASE_DIR).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def _file_stat(path: Path):
+    try:
+        info = path.stat()
+    except FileNotFoundError:
+        return None
+    return (info.st_mtime_ns, info.st_size)
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    try:
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    except FileNotFoundError:
+        return "<missing>"
+    return h.hexdigest()
+
+
+def _dataset_version(file_hashes: dict) -> str:
+    """Versi dataset = hash (skema, taksonomi kategori, gazetteer, hash tiap file sumber).
+
+    Perubahan gazetteer baru terbaca saat data dimuat ulang dari awal.
+    """
+    h = hashlib.sha256()
+    h.update(f"schema={SNAPSHOT_SCHEMA}".encode())
+    h.update(json.dumps(KATEGORI_DEFS, sort_keys=True).encode())
+    h.update(f"gazetteer={_file_hash(GAZETTEER_PATH)}".encode())
+    for source_file, file_hash in file_hashes.items():
+        h.update(f"{source_file}={file_hash}".encode())
+    return h.hexdigest()[:16]
+
+
+def _snapshot_path(key: str) -> Path:
+    return SNAPSHOT_DIR / f"direktori_{key}.parquet"
+
+
+def _read_snapshot(key: str):
+    """Baca snapshot untuk hash `key`; None kalau belum ada / gagal dibaca."""
+    path = _snapshot_path(key)
+    if not path.exists():
+        return None
+    try:
+        df = pd.read_parquet(path)
+    except Exception:
+        return None
+
+    # Parquet mengembalikan kolom list sebagai ndarray → kembalikan ke list
+    for col in LIST_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].map(lambda v: [] if v is None else list(v))
+    return df
+
+
+def _write_snapshot(key: str, df: pd.DataFrame):
+    """Tulis snapshot secara atomik dan hapus snapshot versi lama."""
+    try:
+        SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+        path = _snapshot_path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        for old in SNAPSHOT_DIR.glob("direktori_*.parquet"):
+            if old != path:
+                old.unlink(missing_ok=True)
+    except Exception:
+        # Snapshot hanya optimasi; kalau gagal (read-only FS, pyarrow tidak ada) abaikan.
+        pass
+
+
+# ------------------------------------------------------------
+# Indeks trigram untuk pencarian substring (nama / alamat): kandidat
+# diambil dari irisan posting list trigram query, lalu diverifikasi.
+# ------------------------------------------------------------
+class SubstringIndex:
+    """Pencarian substring case-insensitive via indeks trigram.
+
+    Hasil sama dengan `str.contains(query, case=False, regex=False)`;
+    query < 3 karakter dicek langsung ke semua baris.
+    """
+
+    N = 3
+
+    def __init__(self, values):
+        self._texts = [self._normalize(v) for v in values]
+        postings = {}
+        for i, text in enumerate(self._texts):
+            for gram in self._grams(text):
+                postings.setdefault(gram, []).append(i)
+        self._postings = {g: np.array(ids, dtype=np.intp) for g, ids in postings.items()}
+
+    @staticmethod
+    def _normalize(v) -> str:
+        return v.lower() if isinstance(v, str) else ("" if pd.isna(v) else str(v).lower())
+
+    @classmethod
+    def _grams(cls, text: str) -> set:
+        return {text[j:j + cls.N] for j in range(len(text) - cls.N + 1)}
+
+    def replaced(self, updates: dict) -> "SubstringIndex":
+        """Indeks baru dengan teks baris {i: nilai} diganti.
+
+        Posting list yang tidak tersentuh dipakai bersama (indeks lama tidak diubah).
+        """
+        new = object.__new__(type(self))
+        new._texts = list(self._texts)
+        new._postings = dict(self._postings)
+        removed, added = collections.defaultdict(set), collections.defaultdict(set)
+        for i, value in updates.items():
+            text = self._normalize(value)
+            for gram in self._grams(new._texts[i]):
+                removed[gram].add(i)
+            for gram in self._grams(text):
+                added[gram].add(i)
+            new._texts[i] = text
+        for gram in removed.keys() | added.keys():
+            ids = set(new._postings.get(gram, ())) - removed[gram] | added[gram]
+            if ids:
+                new._postings[gram] = np.array(sorted(ids), dtype=np.intp)
+            else:
+                new._postings.pop(gram, None)
+        return new
+
+    def search(self, query: str) -> np.ndarray:
+        """Indeks baris (urut naik) yang mengandung `query`."""
+        q = query.lower()
+        if len(q) < self.N:
+            return np.array(
+                [i for i, text in enumerate(self._texts) if q in text], dtype=np.intp
+            )
+
+        grams = {q[j:j + self.N] for j in range(len(q) - self.N + 1)}
+        lists = []
+        for gram in grams:
+            ids = self._postings.get(gram)
+            if ids is None:
+                return np.array([], dtype=np.intp)
+            lists.append(ids)
+        lists.sort(key=len)
+        candidates = lists[0]
+        for ids in lists[1:]:
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            if not len(candidates):
+                break
+
+        if len(grams) == 1 and len(q) == self.N:
+            return candidates  # query = satu trigram, tidak perlu verifikasi
+        texts = self._texts
+        return np.array([i for i in candidates if q in texts[i]], dtype=np.intp)
+
+    # ---------- Pencarian fuzzy (toleran salah ketik) ----------
+    @functools.cached_property
+    def _vocab(self):
+        """(kata urut, baris per kata, indeks trigram kata) untuk `fuzzy()`."""
+        word_rows = collections.defaultdict(set)
+        for i, text in enumerate(self._texts):
+            for w in re.findall(r"[a-z0-9]+", text):
+                word_rows[w].add(i)
+        words = sorted(word_rows)
+        rows = [np.array(sorted(word_rows[w]), dtype=np.intp) for w in words]
+        grams = collections.defaultdict(list)
+        for wid, w in enumerate(words):
+            for gram in self._grams(f" {w} "):
+                grams[gram].append(wid)
+        return words, rows, {g: np.array(ids, dtype=np.intp) for g, ids in grams.items()}
+
+    def _fuzzy_word(self, qw: str) -> dict:
+        """{id kata: kemiripan 0..1} untuk kata kosakata yang mirip `qw`."""
+        words, _, grams = self._vocab
+        if len(qw) < self.N:  # terlalu pendek untuk trigram → cocokkan awalan saja
+            lo = bisect.bisect_left(words, qw)
+            hi = bisect.bisect_left(words, qw + "\x7f")
+            return {wid: 1.0 for wid in range(lo, hi)}
+
+        # Kandidat = kata dengan trigram sama terbanyak (tanpa padding akhir, supaya
+        # kata yang baru diketik sebagian tetap cocok dengan awalannya)
+        lists = [grams[g] for g in self._grams(f" {qw}") if g in grams]
+        if not lists:
+            return {}
+        overlap = np.bincount(np.concatenate(lists), minlength=len(words))
+        cand = np.flatnonzero(overlap)
+        if len(cand) > FUZZY_CANDIDATES:
+            cand = cand[np.argpartition(-overlap[cand], FUZZY_CANDIDATES - 1)[:FUZZY_CANDIDATES]]
+
+        max_d = fuzzy_max_edits(len(qw))
+        max_pre = min(max_d, 1)  # awalan (kata belum selesai diketik): maks. 1 salah ketik
+        out = {}
+        for wid in cand.tolist():
+            w = words[wid]
+            d_full = edit_distance(qw, w, max_d)
+            d_pre = edit_distance(qw, w[:len(qw)], max_pre) if len(w) > len(qw) else max_pre + 1
+            sim = max(
+                1 - d_full / max(len(qw), len(w)) if d_full <= max_d else 0.0,
+                0.9 * (1 - d_pre / len(qw)) if d_pre <= max_pre else 0.0,
+            )
+            if sim > 0:
+                out[wid] = sim
+        return out
+
+    def fuzzy(self, query: str):
+        """(baris, skor) yang memuat kata mirip semua kata `query`, skor menurun.
+
+        Skor = rata-rata kemiripan terbaik per kata query. Edit distance hanya
+        dihitung untuk kandidat dari indeks trigram kosakata, bukan per baris.
+        Kata wilayah umum ("kab", "kota", "jalan", ...) diabaikan karena sering
+        ditulis/dihilangkan tidak konsisten.
+        """
+        q_words = list(dict.fromkeys(re.findall(r"[a-z0-9]+", query.lower())))
+        q_words = [w for w in q_words if w not in FUZZY_IGNORED_WORDS] or q_words
+        if not q_words:
+            return np.array([], dtype=np.intp), np.array([], dtype=float)
+        _, word_rows, _ = self._vocab
+        total = np.zeros(len(self._texts))
+        matched = np.ones(len(self._texts), dtype=bool)
+        for qw in q_words:
+            best = np.zeros(len(self._texts))
+            for wid, sim in self._fuzzy_word(qw).items():
+                rows = word_rows[wid]
+                best[rows] = np.maximum(best[rows], sim)
+            matched &= best > 0
+            total += best
+        rows = np.flatnonzero(matched)
+        scores = total[rows] / len(q_words)
+        order = np.argsort(-scores, kind="stable")
+        return rows[order], scores[order]
+
+
+FUZZY_CANDIDATES = 64  # kata kandidat per kata query yang dihitung edit distance-nya
+FUZZY_IGNORED_WORDS = frozenset(
+    "kab kabupaten kota kec kecamatan kel kelurahan desa prov provinsi jl jln jalan no".split()
+)
+
+
+def fuzzy_max_edits(length: int) -> int:
+    """Batas salah ketik per kata: 0 (≤3 huruf), 1 (≤5), 2 (≤8), 3 (lebih panjang)."""
+    return 0 if length <= 3 else 1 if length <= 5 else 2 if length <= 8 else 3
+
+
+def edit_distance(a: str, b: str, max_d: int) -> int:
+    """Jarak Levenshtein; berhenti lebih awal (hasil max_d + 1) kalau > max_d."""
+    if abs(len(a) - len(b)) > max_d:
+        return max_d + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > max_d:
+            return max_d + 1
+        prev = cur
+    return prev[-1] if prev[-1] <= max_d else max_d + 1
+
+
+# ------------------------------------------------------------
+# Pencarian teks bebas (profil, layanan, nama, alamat) dengan peringkat
+# BM25 atas indeks terbalik. Kata dinormalisasi ala bahasa Indonesia:
+# stopword dibuang, kata ulang disederhanakan, imbuhan umum dipotong.
+# ------------------------------------------------------------
+BM25_FIELDS = {  # kolom → bobot frekuensi kata
+    "Nama Organisasi": 2.0,
+    "Layanan Yang Diberikan": 1.5,
+    "Profil Organisasi": 1.0,
+    "Alamat Organisasi": 1.0,
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+BM25_TOP_K = 100
+BM25_MAX_QUERY_TERMS = 8  # batas kerja per query (kata paling jarang dipakai dulu)
+
+STOPWORDS_ID = frozenset("""
+    ada adalah agar akan aku antara apa atas atau bagi bahwa baik banyak
+    beberapa belum berbagai bisa dalam dan dapat dari dengan di dia hal hanya
+    harus hingga ia ini itu jika juga kami kamu karena ke kepada kita lain
+    lebih maupun masih melalui mereka misalnya namun oleh pada para saat
+    sampai sangat saja sebagai secara sedang sejak selain seluruh semua sendiri
+    serta setiap sudah telah tentang terhadap tersebut tidak untuk yaitu yakni
+    yang jl jln no rt rw telp hp
+""".split())
+_ID_PREFIXES = ("meng", "meny", "mem", "men", "me", "peng", "peny", "pem", "pen",
+                "per", "pe", "ber", "be", "ter", "di", "ke", "se")
+_ID_NASAL = {"meny": "s", "peny": "s", "mem": "p", "pem": "p"}
+_ID_ONSETS = ("ng", "ny", "kh", "sy", "bl", "br", "dr", "fl", "fr", "gr", "kl", "kr",
+              "pl", "pr", "sk", "sl", "sp", "st", "tr")
+# Kata yang sering muncul di data dan salah dipotong aturan umum
+# ("perempuan" → "empu", "penanganan" → "angan"). Nama wilayah tidak
+# di-stem sama sekali (lihat `_id_place_words`).
+_ID_STEM_EXCEPTIONS = {
+    "perempuan": "perempuan",
+    "merdeka": "merdeka",
+    "korban": "korban",
+    "pendampingan": "damping",
+    "pendamping": "damping",
+    "penanganan": "tangani",
+    "menangani": "tangani",
+    "ditangani": "tangani",
+    "pengaduan": "adu",
+    "mengadu": "adu",
+    "pendidikan": "didik",
+    "pendidik": "didik",
+    "pemerintah": "perintah",
+    "perintah": "perintah",
+    "keberagaman": "ragam",
+    "sementara": "sementara",
+    "masalah": "masalah",
+    "divisi": "divisi",
+}
+# Kata umum di nama wilayah yang tetap di-stem ("kepulauan" → "pulau").
+_ID_PLACE_GENERIC = frozenset({"kepulauan", "pegunungan", "bagian"})
+
+
+@functools.lru_cache(maxsize=1)
+def _id_place_words() -> frozenset:
+    """Kata di nama/alias provinsi & kab/kota gazetteer ("bengkulu", "selatan").
+
+    Nama tempat sering terlihat seperti kata berimbuhan ("be-ngkulu",
+    "se-marang", "kalimant-an"), jadi tidak di-stem.
+    """
+    try:
+        gz = pd.read_csv(GAZETTEER_PATH, dtype=str, keep_default_na=False)
+    except Exception:
+        return frozenset()
+    names = " ".join(gz.get("nama", pd.Series(dtype=str))) + " " + " ".join(
+        gz.get("alias", pd.Series(dtype=str))
+    )
+    return frozenset(re.findall(r"[a-z]+", names.lower())) - _ID_PLACE_GENERIC
+
+
+def _id_root_ok(root: str) -> bool:
+    """Sisa kata masih layak jadi kata dasar: ≥ 4 huruf, ≥ 2 suku kata, awal wajar."""
+    if len(root) < 4 or len(re.findall(r"[aeiou]+", root)) < 2:
+        return False
+    if root[0] in "aeiou" or root[1] in "aeiou":
+        return True
+    # gugus konsonan di awal hanya kalau langsung diikuti vokal ("ngkulu" tidak)
+    return root[:2] in _ID_ONSETS and root[2] in "aeiou"
+
+
+def _id_prefix_ok(prefix: str, root: str) -> bool:
+    """Bentuk pendek awalan hanya muncul di depan huruf tertentu.
+
+    "be-" sebelum r atau suku kata -er ("bekerja"); "me-" sebelum l/r/w/y/m/n
+    ("melihat"), jadi "mediasi" bukan me- + diasi.
+    """
+    if prefix == "be":
+        return root[0] == "r" or root[1:3] == "er"
+    if prefix == "me":
+        return root[0] in "lrwymn"
+    return True
+
+
+@functools.lru_cache(maxsize=50_000)
+def stem_id(word: str) -> str:
+    """Stemmer ringan bahasa Indonesia: partikel, kepemilikan, akhiran, awalan.
+
+    Tidak selalu menghasilkan kata dasar yang benar, tapi konsisten untuk
+    query dan dokumen ("perlindungan" / "melindungi" → "lindung"). Imbuhan
+    hanya dilepas kalau sisanya masih layak jadi kata dasar (`_id_root_ok`).
+    """
+    if word in _ID_STEM_EXCEPTIONS:
+        return _ID_STEM_EXCEPTIONS[word]
+    if word in _id_place_words():
+        return word
+    w = word
+    verbal = word.startswith(("me", "di", "ter", "ber"))
+    for suffixes in (("lah", "kah", "pun"), ("nya", "ku", "mu"), ("kan", "an", "i")):
+        for suf in suffixes:
+            if suf == "i" and (not verbal or re.search(r"[aeiou]si$", w)):
+                continue  # -i hanya pada kata kerja; "-asi/-isi" kata serapan ("advokasi")
+            if w.endswith(suf) and _id_root_ok(w[: -len(suf)]):
+                w = w[: -len(suf)]
+                break
+    for _ in range(2):  # mis. "memper-", "diper-"
+        pre = next((p for p in _ID_PREFIXES if w.startswith(p)), None)
+        if pre is None:
+            break
+        rest = w[len(pre):]
+        if rest[:1] in tuple("aeiou"):
+            rest = _ID_NASAL.get(pre, "") + rest
+        if not (_id_root_ok(rest) and _id_prefix_ok(pre, rest)):
+            break  # awalan terpanjang yang cocok tidak bisa dilepas → berhenti
+        w = rest
+    return w
+
+
+def bm25_tokens(text) -> list:
+    """Token ternormalisasi: huruf kecil, tanpa stopword, "anak-anak" → "anak"."""
+    words = re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)*", safe_str(text).lower())
+    out = []
+    for w in words:
+        parts = w.split("-")
+        if len(parts) == 2 and parts[0] == parts[1]:
+            parts = parts[:1]  # kata ulang
+        for part in parts:
+            if part not in STOPWORDS_ID and (len(part) > 1 or part.isdigit()):
+                out.append(stem_id(part) if part.isalpha() else part)
+    return out
+
+
+class BM25Index:
+    """Indeks terbalik kata → (baris, frekuensi berbobot) dengan skor BM25.
+
+    Skor hanya dihitung untuk baris di posting list kata query, bukan
+    dengan memindai teks semua baris.
+    """
+
+    def __init__(self, columns: dict):
+        n = len(next(iter(columns.values()), []))
+        self._n = n
+        # Token per kolom per baris, supaya `replaced` bisa mencabut kontribusi lama
+        self._tokens = {
+            col: [tuple(bm25_tokens(text)) for text in values] for col, values in columns.items()
+        }
+        postings = collections.defaultdict(dict)
+        self._doc_len = np.zeros(n, dtype=float)
+        for i in range(n):
+            tf = self._row_tf(i)
+            self._doc_len[i] = sum(tf.values())
+            for term, w in tf.items():
+                postings[term][i] = w
+        self._postings = {
+            term: (np.fromiter(c.keys(), np.intp, len(c)), np.fromiter(c.values(), float, len(c)))
+            for term, c in postings.items()
+        }
+        self._set_norm()
+
+    def _row_tf(self, i: int) -> collections.Counter:
+        """Frekuensi kata berbobot kolom untuk baris i."""
+        tf = collections.Counter()
+        for col, tokens in self._tokens.items():
+            weight = BM25_FIELDS.get(col, 1.0)
+            for term in tokens[i]:
+                tf[term] += weight
+        return tf
+
+    def _set_norm(self):
+        avgdl = self._doc_len.mean() if self._n and self._doc_len.mean() > 0 else 1.0
+        self._norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len / avgdl)
+
+    def replaced(self, updates: dict) -> "BM25Index":
+        """Indeks baru dengan teks {kolom: {i: nilai}} diganti.
+
+        Hanya posting list kata yang muncul di baris lama/baru yang dibangun
+        ulang (df ikut berubah lewat panjang posting list); panjang dokumen
+        rata-rata dihitung ulang dari array, bukan dari teks.
+        """
+        rows = sorted({i for values in updates.values() for i in values})
+        old_tf = {i: self._row_tf(i) for i in rows}
+        new = object.__new__(type(self))
+        new._n = self._n
+        new._tokens = dict(self._tokens)
+        for col, values in updates.items():
+            if col in new._tokens:
+                tokens = list(new._tokens[col])
+                for i, value in values.items():
+                    tokens[i] = tuple(bm25_tokens(value))
+                new._tokens[col] = tokens
+        new_tf = {i: new._row_tf(i) for i in rows}
+        new._doc_len = self._doc_len.copy()
+        for i in rows:
+            new._doc_len[i] = sum(new_tf[i].values())
+
+        new._postings = dict(self._postings)
+        touched = np.array(rows, dtype=np.intp)
+        for term in set().union(*old_tf.values(), *new_tf.values()):
+            old_rows, old_w = self._postings.get(term, (touched[:0], np.empty(0)))
+            keep = ~np.isin(old_rows, touched)
+            added = [i for i in rows if term in new_tf[i]]
+            term_rows = np.concatenate([old_rows[keep], np.array(added, dtype=np.intp)])
+            if len(term_rows):
+                term_w = np.concatenate([old_w[keep], [new_tf[i][term] for i in added]])
+                new._postings[term] = (term_rows, term_w)
+            else:
+                new._postings.pop(term, None)
+        new._set_norm()
+        return new
+
+    def __len__(self) -> int:
+        return self._n
+
+    def search(self, query: str, k: int = BM25_TOP_K):
+        """(baris, skor) untuk k baris paling relevan, urut skor menurun."""
+        terms = [t for t in dict.fromkeys(bm25_tokens(query)) if t in self._postings]
+        if not terms:
+            return np.array([], dtype=np.intp), np.array([], dtype=float)
+        terms = sorted(terms, key=lambda t: len(self._postings[t][0]))[:BM25_MAX_QUERY_TERMS]
+
+        rows_parts, score_parts = [], []
+        for term in terms:
+            rows, tf = self._postings[term]
+            df = len(rows)
+            idf = math.log(1 + (self._n - df + 0.5) / (df + 0.5))
+            rows_parts.append(rows)
+            score_parts.append(idf * tf * (BM25_K1 + 1) / (tf + self._norm[rows]))
+        rows, inverse = np.unique(np.concatenate(rows_parts), return_inverse=True)
+        scores = np.bincount(inverse, np.concatenate(score_parts), len(rows))
+
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        order = np.lexsort((rows, -scores))  # skor sama → urutan data
+        return rows[order], scores[order]
+
+
+# ------------------------------------------------------------
+# Indeks spasial untuk pencarian lembaga terdekat: titik dikelompokkan ke
+# sel grid lat/lon; jarak hanya dihitung untuk titik di sel sekitar query.
+# ------------------------------------------------------------
+EARTH_RADIUS_KM = 6371.0088
+SPATIAL_CELL_DEG = 0.5  # ±55 km per sel di ekuator
+
+
+def _unit_vectors(lat, lon) -> np.ndarray:
+    la, lo = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(la) * np.cos(lo), np.cos(la) * np.sin(lo), np.sin(la)])
+
+
+class SpatialIndex:
+    """k-terdekat & pencarian radius atas baris yang punya koordinat.
+
+    Jarak = jarak great-circle (km) dari vektor satuan 3D, dihitung hanya untuk
+    kandidat di sel grid yang beririsan dengan radius pencarian.
+    """
+
+    def __init__(self, lat, lon, cell_deg: float = SPATIAL_CELL_DEG):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        ok = np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        self.cell_deg = cell_deg
+        self.rows = np.flatnonzero(ok)
+        self._xyz = _unit_vectors(lat[ok], lon[ok])
+        self._n_lat = int(math.ceil(180 / cell_deg))
+        self._n_lon = int(math.ceil(360 / cell_deg))
+
+        cells = self._cell_of(lat[ok], lon[ok])
+        order = np.argsort(cells, kind="stable")
+        keys, starts = np.unique(cells[order], return_index=True)
+        self._cells = dict(zip(keys.tolist(), np.split(order, starts[1:])))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _cell_of(self, lat, lon):
+        ci = np.clip(((np.asarray(lat) + 90) // self.cell_deg).astype(np.int64), 0, self._n_lat - 1)
+        cj = np.clip(((np.asarray(lon) + 180) // self.cell_deg).astype(np.int64), 0, self._n_lon - 1)
+        return ci * self._n_lon + cj
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Posisi (di `self.rows`) semua titik di sel yang mungkin masuk radius."""
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        lat_lo, lat_hi = lat - dlat, lat + dlat
+        coslat = math.cos(math.radians(min(90.0, max(abs(lat_lo), abs(lat_hi)))))
+        if lat_lo <= -90 or lat_hi >= 90 or coslat < 1e-6 or dlat / coslat >= 180:
+            return np.arange(len(self.rows))  # radius mencakup kutub / seluruh bujur
+
+        dlon = dlat / coslat
+        ci_lo, ci_hi = self._cell_of(lat_lo, 0) // self._n_lon, self._cell_of(lat_hi, 0) // self._n_lon
+        cj_lo = int((lon - dlon + 180) // self.cell_deg)
+        cj_hi = int((lon + dlon + 180) // self.cell_deg)
+        n_cells = (ci_hi - ci_lo + 1) * (cj_hi - cj_lo + 1)
+        if n_cells >= len(self._cells):
+            return np.arange(len(self.rows))
+
+        parts = []
+        for ci in range(int(ci_lo), int(ci_hi) + 1):
+            for cj in range(cj_lo, cj_hi + 1):
+                part = self._cells.get(ci * self._n_lon + cj % self._n_lon)
+                if part is not None:
+                    parts.append(part)
+        return np.concatenate(parts) if parts else np.array([], dtype=np.intp)
+
+    def _distances(self, pos, lat: float, lon: float) -> np.ndarray:
+        chord = np.linalg.norm(self._xyz[pos] - _unit_vectors([lat], [lon])[0], axis=1)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+
+    def within(self, lat: float, lon: float, radius_km: float, allowed=None):
+        """(baris, jarak_km) dalam radius, urut dari yang terdekat.
+
+        `allowed` = mask boolean per baris data (mis. hasil filter kategori).
+        """
+        pos = self._candidates(lat, lon, radius_km)
+        if allowed is not None:
+            pos = pos[allowed[self.rows[pos]]]
+        dist = self._distances(pos, lat, lon)
+        keep = dist <= radius_km
+        pos, dist = pos[keep], dist[keep]
+        order = np.argsort(dist, kind="stable")
+        return self.rows[pos[order]], dist[order]
+
+    def nearest(self, lat: float, lon: float, k: int, allowed=None):
+        """(baris, jarak_km) untuk k lembaga terdekat; radius diperbesar bertahap."""
+        n_allowed = len(self.rows) if allowed is None else int(allowed[self.rows].sum())
+        k = min(int(k), n_allowed)
+        if k <= 0:
+            return np.array([], dtype=np.intp), np.array([], dtype=float)
+        radius = self.cell_deg * 111.2
+        while True:
+            rows, dist = self.within(lat, lon, radius, allowed)
+            if len(rows) >= k or radius >= math.pi * EARTH_RADIUS_KM:
+                return rows[:k], dist[:k]
+            radius *= 2
+
+    def distance_km(self, rows, lat: float, lon: float) -> np.ndarray:
+        """Jarak ke baris `rows` (NaN untuk baris tanpa koordinat)."""
+        rows = np.asarray(rows, dtype=np.intp)
+        out = np.full(len(rows), np.nan)
+        pos = np.searchsorted(self.rows, rows)
+        has = (pos < len(self.rows)) & (self.rows[np.minimum(pos, len(self.rows) - 1)] == rows)
+        if has.any():
+            out[has] = self._distances(pos[has], lat, lon)
+        return out
+
+
+# ------------------------------------------------------------
+# Klaster peta di server: titik dikelompokkan ke sel grid yang ukurannya
+# mengikuti zoom. Sel tiap titik per zoom dihitung sekali per versi data;
+# ke browser hanya dikirim ringkasan klaster di dalam viewport.
+# ------------------------------------------------------------
+MAP_ZOOM_LEVELS = range(3, 13)
+MAP_CELL_PX = 64  # ukuran sel klaster di layar (piksel)
+MAP_VIEW_PX = (900, 500)  # ukuran peta (lebar, tinggi); viewport dihitung dari sini
+MAP_DEFAULT_VIEW = (-2.5, 118.0, 4)  # seluruh Indonesia
+
+
+def map_cell_deg(zoom: int) -> float:
+    """Lebar sel klaster (derajat bujur) pada zoom tertentu (tile 256 px)."""
+    return 360.0 / (2**zoom) * MAP_CELL_PX / 256
+
+
+def map_viewport(lat: float, lon: float, zoom: int) -> tuple:
+    """(lat_min, lat_max, lon_min, lon_max) yang terlihat di peta ukuran MAP_VIEW_PX."""
+    deg_px = 360.0 / (256 * 2**zoom)
+    half_w = MAP_VIEW_PX[0] / 2 * deg_px
+    # Mercator: derajat lintang per piksel mengecil sebanding cos(lintang)
+    half_h = MAP_VIEW_PX[1] / 2 * deg_px * math.cos(math.radians(lat))
+    return (max(-90.0, lat - half_h), min(90.0, lat + half_h), lon - half_w, lon + half_w)
+
+
+class ClusterIndex:
+    """Sel grid per zoom untuk tiap baris berkoordinat + agregat klasternya.
+
+    Agregat tanpa filter untuk semua zoom dihitung di awal; agregat untuk
+    subset baris (hasil filter) dihitung dari sel yang sama lewat `clusters()`.
+    """
+
+    def __init__(self, spatial: SpatialIndex, lat, lon):
+        self.rows = spatial.rows
+        self._lat = np.asarray(lat, dtype=float)[self.rows]
+        self._lon = np.asarray(lon, dtype=float)[self.rows]
+        self._cells = {}
+        for zoom in MAP_ZOOM_LEVELS:
+            deg = map_cell_deg(zoom)
+            n_lon = int(math.ceil(360 / deg))
+            ci = ((self._lat + 90) // deg).astype(np.int64)
+            cj = ((self._lon + 180) // deg).astype(np.int64)
+            self._cells[zoom] = ci * n_lon + cj
+        self._all = {zoom: self._aggregate(zoom, None) for zoom in MAP_ZOOM_LEVELS}
+
+    @staticmethod
+    def zoom_level(zoom: int) -> int:
+        return min(max(int(zoom), MAP_ZOOM_LEVELS[0]), MAP_ZOOM_LEVELS[-1])
+
+    def _aggregate(self, zoom: int, pos) -> pd.DataFrame:
+        """Satu baris per sel: titik tengah (rata-rata), jumlah, dan baris contoh."""
+        cells = self._cells[zoom]
+        if pos is not None:
+            cells = cells[pos]
+        else:
+            pos = np.arange(len(cells))
+        keys, inverse, counts = np.unique(cells, return_inverse=True, return_counts=True)
+        first = np.full(len(keys), len(pos), dtype=np.intp)
+        np.minimum.at(first, inverse, np.arange(len(pos)))
+        return pd.DataFrame({
+            "lat": np.bincount(inverse, self._lat[pos], len(keys)) / np.maximum(counts, 1),
+            "lon": np.bincount(inverse, self._lon[pos], len(keys)) / np.maximum(counts, 1),
+            "jumlah": counts,
+            "baris": self.rows[pos[first]] if len(keys) else np.array([], dtype=np.intp),
+        })
+
+    def clusters(self, zoom: int, idx=None) -> pd.DataFrame:
+        """Klaster seluruh peta pada `zoom`; `idx` = baris hasil filter (None = semua)."""
+        zoom = self.zoom_level(zoom)
+        if idx is None:
+            return self._all[zoom]
+        pos = np.flatnonzero(np.isin(self.rows, idx))
+        return self._aggregate(zoom, pos)
+
+    @staticmethod
+    def in_view(clusters: pd.DataFrame, lat: float, lon: float, zoom: int) -> pd.DataFrame:
+        """Klaster yang titik tengahnya ada di viewport (plus satu sel di tepi)."""
+        lat_lo, lat_hi, lon_lo, lon_hi = map_viewport(lat, lon, zoom)
+        pad = map_cell_deg(ClusterIndex.zoom_level(zoom))
+        keep = (
+            clusters["lat"].between(lat_lo - pad, lat_hi + pad)
+            & clusters["lon"].between(lon_lo - pad, lon_hi + pad)
+        )
+        return clusters[keep]
+
+
+# ------------------------------------------------------------
+# ID lembaga: hash dari isi (sumber, nama, alamat) + nomor urut kalau kembar,
+# jadi tetap sama antar reload selama datanya tidak berubah.
+# ------------------------------------------------------------
+def _id_part(val) -> str:
+    return " ".join(safe_str(val).lower().split())
+
+
+def make_org_ids(sumber, nama, alamat) -> np.ndarray:
+    ids = np.empty(len(nama), dtype=object)
+    seen = collections.Counter()
+    for i, parts in enumerate(zip(sumber, nama, alamat)):
+        key = "\x1f".join(_id_part(v) for v in parts)
+        base = hashlib.blake2b(key.encode(), digest_size=6).hexdigest()
+        seen[base] += 1
+        ids[i] = base if seen[base] == 1 else f"{base}-{seen[base]}"
+    return ids
+
+
+# ------------------------------------------------------------
+# Dataset bersama: satu objek read-only per versi data, dipakai semua sesi
+# tanpa disalin. Filter mengembalikan array indeks baris, bukan frame baru.
+# ------------------------------------------------------------
+class Direktori:
+    """Snapshot read-only data direktori: kolom sebagai ndarray beku.
+
+    `layanan_list` disimpan sebagai tuple; `kategori_layanan` disimpan sebagai
+    bitmask (`kategori_mask`) dan baru diubah ke tuple nama kategori untuk
+    baris yang diminta lewat `row()` / `take()`.
+    Indeks pencarian nama/alamat dan indeks spasial dibangun sekali di sini,
+    per versi data. `ids` = ID lembaga per baris kalau sudah diketahui (mis.
+    baris hasil penggabungan duplikat); kalau tidak, dihitung dari isinya.
+    """
+
+    def __init__(self, version: str, frame: pd.DataFrame, ids=None):
+        self.version = version
+        self.columns = list(frame.columns)
+        self._n = len(frame)
+        self._data = {}
+
+        kategori = frame["kategori_layanan"] if "kategori_layanan" in frame else []
+        self.kategori_mask = np.fromiter(
+            (kategori_to_mask(v) for v in kategori), dtype=np.uint32, count=self._n
+        )
+        self.kategori_mask.setflags(write=False)
+        present = functools.reduce(np.bitwise_or, np.unique(self.kategori_mask), 0)
+        self.categories = list(mask_to_kategori(int(present)))
+
+        for col in self.columns:
+            if col == "kategori_layanan":
+                continue
+            if col in LIST_COLUMNS:
+                arr = np.empty(len(frame), dtype=object)
+                arr[:] = [tuple(v) for v in frame[col]]
+            elif col in ("Latitude", "Longitude"):
+                arr = pd.to_numeric(frame[col], errors="coerce").to_numpy(
+                    dtype=float, copy=True
+                )
+            else:
+                arr = frame[col].to_numpy(dtype=object, copy=True)
+            arr.setflags(write=False)
+            self._data[col] = arr
+
+        if ids is None:
+            ids = make_org_ids(
+                self._data["Sumber Data"],
+                self._data["Nama Organisasi"],
+                self._data["Alamat Organisasi"],
+            )
+        self.ids = np.array(ids, dtype=object)
+        self.ids.setflags(write=False)
+        self._id_index = {org_id: i for i, org_id in enumerate(self.ids)}
+
+        self.name_index = SubstringIndex(self._data["Nama Organisasi"])
+        self.addr_index = SubstringIndex(self._data["Alamat Organisasi"])
+        self.spatial_index = SpatialIndex(self._data["Latitude"], self._data["Longitude"])
+
+    def __len__(self) -> int:
+        return self._n
+
+    def column(self, name: str) -> np.ndarray:
+        return self._data[name]
+
+    def row(self, i: int) -> dict:
+        out = {col: arr[i] for col, arr in self._data.items()}
+        out["kategori_layanan"] = mask_to_kategori(int(self.kategori_mask[i]))
+        return out
+
+    def take(self, idx) -> pd.DataFrame:
+        """DataFrame baru berisi baris `idx` saja (indeks 0..len(idx)-1)."""
+        idx = np.asarray(idx, dtype=np.intp)
+        out = {}
+        for col in self.columns:
+            if col == "kategori_layanan":
+                kategori = np.empty(len(idx), dtype=object)
+                kategori[:] = [mask_to_kategori(int(m)) for m in self.kategori_mask[idx]]
+                out[col] = kategori
+            else:
+                out[col] = self._data[col][idx]
+        return pd.DataFrame(out)
+
+    def all_index(self) -> np.ndarray:
+        return np.arange(len(self), dtype=np.intp)
+
+    def row_of(self, org_id):
+        """Posisi baris untuk ID lembaga; None kalau ID tidak ada di versi ini."""
+        return self._id_index.get(org_id)
+
+    def with_aliases(self, aliases: dict) -> "Direktori":
+        """Versi ini + ID lembaga yang sudah digabung → ID lembaga utama.
+
+        `row_of`/`label` untuk ID lama menunjuk ke baris utama. Peta ID
+        disalin, jadi versi ini (dan salinan `with_patches`-nya) tidak berubah.
+        """
+        new = copy.copy(self)
+        new._id_index = dict(self._id_index)
+        for old_id, main_id in aliases.items():
+            if main_id in new._id_index and old_id not in new._id_index:
+                new._id_index[old_id] = new._id_index[main_id]
+        return new
+
+    def label(self, org_id) -> str:
+        """Nama lembaga untuk ditampilkan (selectbox, pesan)."""
+        i = self._id_index.get(org_id)
+        return "" if i is None else safe_str(self._data["Nama Organisasi"][i])
+
+    def with_patches(self, version: str, updates: dict) -> "Direktori":
+        """Versi baru dengan nilai baris {i: {kolom: nilai}} diganti.
+
+        Hanya kolom, bitmask kategori, entri indeks pencarian, dan HTML card
+        dari baris yang berubah yang dihitung ulang; sisanya dipakai bersama
+        dengan versi ini (yang tidak ikut berubah).
+        """
+        new = copy.copy(self)
+        new.version = version
+        if not updates:
+            return new
+        new._data = dict(self._data)
+        new.__dict__.pop("card_html", None)
+        new.__dict__.pop("org_options", None)
+
+        by_col = collections.defaultdict(dict)
+        for i, values in updates.items():
+            for col, value in values.items():
+                by_col[col][i] = value
+        for col, values in by_col.items():
+            arr = self._data[col].copy()
+            for i, value in values.items():
+                arr[i] = value
+            arr.setflags(write=False)
+            new._data[col] = arr
+
+        layanan = by_col.get("Layanan Yang Diberikan")
+        if layanan:
+            rows = list(layanan)
+            texts = [safe_str(v).replace("\n", " ") for v in layanan.values()]
+            mask = self.kategori_mask.copy()
+            mask[rows] = categorize_texts(texts)
+            mask.setflags(write=False)
+            new.kategori_mask = mask
+            present = functools.reduce(np.bitwise_or, np.unique(mask), 0)
+            new.categories = list(mask_to_kategori(int(present)))
+            if "layanan_list" in new._data:
+                lists = self._data["layanan_list"].copy()
+                for i, text in zip(rows, texts):
+                    lists[i] = tuple(_split_layanan(text))
+                lists.setflags(write=False)
+                new._data["layanan_list"] = lists
+
+        if "Nama Organisasi" in by_col:
+            new.name_index = self.name_index.replaced(by_col["Nama Organisasi"])
+        elif "org_options" in self.__dict__:
+            new.org_options = self.org_options
+        if "Alamat Organisasi" in by_col:
+            new.addr_index = self.addr_index.replaced(by_col["Alamat Organisasi"])
+        if by_col.keys() & BM25_FIELDS.keys() and "text_index" in self.__dict__:
+            new.text_index = self.text_index.replaced(
+                {col: values for col, values in by_col.items() if col in BM25_FIELDS}
+            )
+        if by_col.keys() & {"Latitude", "Longitude"}:
+            new.spatial_index = SpatialIndex(new._data["Latitude"], new._data["Longitude"])
+            new.__dict__.pop("cluster_index", None)
+
+        if "card_html" in self.__dict__:
+            cards = self.card_html.copy()
+            for i in updates:
+                row = new.row(i)
+                row["badge_html"] = get_source_badge_html(row.get("Sumber Data", ""))
+                cards[i] = build_card_html(row)
+            cards.setflags(write=False)
+            new.card_html = cards
+        return new
+
+    @functools.cached_property
+    def card_html(self) -> np.ndarray:
+        """HTML card per baris (dibangun sekali per versi data)."""
+        badges = {}
+        cards = np.empty(len(self), dtype=object)
+        for i in range(len(self)):
+            row = self.row(i)
+            sumber = row.get("Sumber Data", "")
+            if sumber not in badges:
+                badges[sumber] = get_source_badge_html(sumber)
+            row["badge_html"] = badges[sumber]
+            cards[i] = build_card_html(row)
+        cards.setflags(write=False)
+        return cards
+
+    @functools.cached_property
+    def text_index(self) -> BM25Index:
+        """Indeks BM25 profil/layanan/nama/alamat (dibangun sekali per versi data)."""
+        return BM25Index({col: self._data[col] for col in BM25_FIELDS if col in self._data})
+
+    @functools.cached_property
+    def cluster_index(self) -> ClusterIndex:
+        """Klaster peta per zoom (dibangun sekali per versi data, saat peta dibuka)."""
+        return ClusterIndex(self.spatial_index, self._data["Latitude"], self._data["Longitude"])
+
+    @functools.cached_property
+    def org_options(self) -> list:
+        """ID lembaga yang punya nama, urut nama (untuk selectbox koreksi)."""
+        names = self._data["Nama Organisasi"]
+        rows = [i for i in range(len(self)) if safe_str(names[i])]
+        rows.sort(key=lambda i: safe_str(names[i]))
+        return [self.ids[i] for i in rows]
+
+
+# ------------------------------------------------------------
+# Hot reload: file sumber dicek (mtime/size, lalu hash isi) secara berkala.
+# Hanya baris dari file yang berubah yang di-parse & dikategorikan ulang.
+# ------------------------------------------------------------
+class DataStore:
+    """Data direktori gabungan yang di-reload per file sumber.
+
+    `current()` mengembalikan `Direktori` versi terbaru. Versi baru dipasang
+    dengan satu assignment, jadi sesi lain tetap memakai versi lama sampai
+    versi baru selesai dibangun. `warnings()` = peringatan ingest versi itu,
+    ditampilkan oleh halaman (bukan di sini) supaya semua sesi melihatnya.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}  # sumber_file → (mtime_ns, size)
+        self._hashes = {}  # sumber_file → hash isi file
+        self._frames = {}  # sumber_file → baris dari file tsb
+        self._warnings = {}  # sumber_file → peringatan ingest terakhir file tsb
+        self._stale = set()  # sumber_file yang gagal dibaca; barisnya dari versi lama
+        self._checked_at = 0.0
+        self._current = None  # Direktori
+        with self._lock:
+            self._refresh()
+
+    def current(self):
+        due = time.monotonic() - self._checked_at >= RELOAD_CHECK_SECONDS
+        # Kalau sesi lain sedang rebuild, pakai versi yang ada dulu.
+        if due and self._lock.acquire(blocking=False):
+            try:
+                self._refresh()
+            finally:
+                self._lock.release()
+        return self._current
+
+    def warnings(self) -> list:
+        return [msg for msgs in self._warnings.values() for msg in msgs]
+
+    def _refresh(self):
+        tasks = source_paths()
+        ids = {_source_file_id(path): (key, path) for key, path in tasks}
+        stats = {sid: _file_stat(path) for sid, (_, path) in ids.items()}
+        self._checked_at = time.monotonic()
+        if self._current is not None and stats == self._stats:
+            return
+
+        hashes = {
+            sid: self._hashes[sid]
+            if sid in self._hashes and stats[sid] == self._stats.get(sid)
+            else _file_hash(path)
+            for sid, (_, path) in ids.items()
+        }
+        version = _dataset_version(hashes)
+        self._stats = stats
+        if self._current is not None and version == self._current.version:
+            # File hanya di-touch, atau file yang tadi rusak kembali ke isi semula
+            self._hashes = hashes
+            if self._stale:
+                self._warnings = {
+                    sid: msgs for sid, msgs in self._warnings.items() if sid not in self._stale
+                }
+                self._stale = set()
+            return
+
+        if self._current is None:
+            snapshot = _read_snapshot(version)
+            if snapshot is not None and "sumber_file" in snapshot.columns:
+                self._frames = {
+                    sid: part for sid, part in snapshot.groupby("sumber_file", sort=False)
+                }
+                self._hashes = hashes
+
+        changed = [
+            ids[sid]
+            for sid in ids
+            if sid not in self._frames or hashes[sid] != self._hashes.get(sid)
+        ]
+        frames = {sid: self._frames[sid] for sid in ids if sid in self._frames}
+        warnings = {sid: self._warnings[sid] for sid in ids if sid in self._warnings}
+        kept, all_ok = [], True
+        stale = set(self._stale)
+        for r in ingest(changed):
+            sid = _source_file_id(r.path)
+            warnings[sid] = tuple(r.warnings)
+            all_ok = all_ok and r.ok
+            if not r.ok and sid in frames:
+                # file baru rusak/setengah tersalin → pakai baris versi lama
+                warnings[sid] += (f"Data '{sid}' versi sebelumnya tetap dipakai.",)
+                kept.append(sid)
+                continue
+            stale.discard(sid)
+            frames[sid] = _prepare_source_frame(r.frame, sid)
+        stale.update(kept)
+
+        if kept:
+            # Hash lama dipertahankan: file dibaca ulang begitu berubah lagi
+            # (mis. selesai disalin), dan kalau hanya file itu yang berubah,
+            # versi yang sedang dipakai tetap berlaku.
+            hashes.update({sid: self._hashes[sid] for sid in kept if sid in self._hashes})
+            version = _dataset_version(hashes)
+            if self._current is not None and version == self._current.version:
+                self._hashes = hashes
+                self._warnings = warnings
+                self._stale = stale
+                return
+
+        parts = [frames[sid] for sid in ids if not frames[sid].empty]
+        df = (
+            pd.concat(parts, ignore_index=True, sort=False)
+            if parts
+            else _prepare_source_frame(pd.DataFrame(), "")
+        )
+        if changed and all_ok:
+            _write_snapshot(version, df)  # snapshot hanya dari sumber yang terbaca utuh
+
+        self._frames = frames
+        self._hashes = hashes
+        self._warnings = warnings
+        self._stale = stale
+        self._current = Direktori(version, df)
+
+
+@st.cache_resource(show_spinner=False)
+def get_data_store() -> DataStore:
+    return DataStore()
+
+
+def load_data() -> Direktori:
+    """Data direktori gabungan versi terbaru (read-only, dipakai bersama)."""
+    return get_data_store().current()
+
+
+def filter_direktori(
+    data: Direktori,
+    name: str,
+    addr: str,
+    categories,
+    near=None,
+    text: str = "",
+    fuzzy: bool = False,
+) -> np.ndarray:
+    """Indeks baris yang cocok dengan filter nama, alamat, dan kategori.
+
+    Nama/alamat dicocokkan sebagai substring biasa (bukan regex), tanpa
+    membedakan huruf besar/kecil; dengan `fuzzy` per kata dan toleran salah
+    ketik, diurutkan menurut kemiripan. `text` = kata kunci bebas: hasil
+    dibatasi ke BM25_TOP_K baris paling relevan dan diurutkan menurut skor.
+    `near` = (lat, lon, "k" | "radius", nilai): hasil dibatasi ke k terdekat /
+    dalam radius km dan diurutkan menurut jarak.
+    """
+    ranked = bool(bm25_tokens(text))
+    idx = data.text_index.search(text)[0] if ranked else data.all_index()
+    similarity = np.zeros(len(data)) if fuzzy else None
+    for query, index in ((name, data.name_index), (addr, data.addr_index)):
+        if not query:
+            continue
+        if fuzzy:
+            rows, scores = index.fuzzy(query)
+            similarity[rows] += scores
+        else:
+            rows = index.search(query)
+        idx = idx[np.isin(idx, rows, assume_unique=True)]
+    if fuzzy and (name or addr) and not ranked:
+        idx = idx[np.argsort(-similarity[idx], kind="stable")]
+    if categories:
+        # "salah satu kategori terpilih" = AND bitmask ≠ 0
+        selected = np.uint32(kategori_to_mask(categories))
+        idx = idx[(data.kategori_mask[idx] & selected) != 0]
+    if near:
+        lat, lon, mode, value = near
+        allowed = np.zeros(len(data), dtype=bool)
+        allowed[idx] = True
+        if mode == "k":
+            idx, _ = data.spatial_index.nearest(lat, lon, value, allowed)
+        else:
+            idx, _ = data.spatial_index.within(lat, lon, value, allowed)
+    return idx
+
+
+# ------------------------------------------------------------
+# Cache hasil filter: klik pagination / detail / expander tidak perlu
+# menghitung ulang filter selama query & versi data sama.
+# ------------------------------------------------------------
+FILTER_CACHE_SIZE = 256
+
+
+class LRUCache:
+    """LRU kecil thread-safe (dipakai bersama semua sesi via cache_resource)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
+@st.cache_resource(show_spinner=False)
+def get_filter_cache() -> LRUCache:
+    return LRUCache(FILTER_CACHE_SIZE)
+
+
+def filter_key(
+    data: Direktori, name: str, addr: str, categories, near=None, text: str = "", fuzzy=False
+) -> tuple:
+    """Signature query ternormalisasi + versi data (kunci cache filter/ekspor)."""
+    return (
+        name.lower(),
+        addr.lower(),
+        tuple(sorted(categories)),
+        near,
+        " ".join(bm25_tokens(text)),
+        bool(fuzzy and (name or addr)),
+        data.version,
+    )
+
+
+def cached_filter(
+    data: Direktori, name: str, addr: str, categories, near=None, text: str = "", fuzzy=False
+) -> np.ndarray:
+    """`filter_direktori` dengan cache per (query ternormalisasi, versi data)."""
+    key = filter_key(data, name, addr, categories, near, text, fuzzy)
+    cache = get_filter_cache()
+    idx = cache.get(key)
+    if idx is None:
+        idx = filter_direktori(data, name, addr, categories, near, text, fuzzy).astype(np.int32)
+        idx.setflags(write=False)
+        cache.put(key, idx)
+    return idx
+
+
+# ------------------------------------------------------------
+# Tabel & ekspor hasil filter (CSV / XLSX / Parquet). File ekspor dibuat
+# hanya saat diminta, ditulis per potongan baris ke disk, dan dipakai ulang
+# selama signature filter & versi data sama.
+# ------------------------------------------------------------
+EXPORT_DIR = SNAPSHOT_DIR / "export"
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_GRACE_SECONDS = 15 * 60  # ekspor versi lama baru dihapus setelah selama ini
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "XLSX": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+TABLE_COLUMNS = {
+    "Nama Organisasi": "Organisation Name",
+    "Alamat Organisasi": "Address",
+    "Kontak Lembaga/Layanan": "Service Contact",
+    "Email Lembaga": "Service Email",
+    "kategori_layanan": "Service Categories",
+    "Sumber Data": "Source",
+    "Latitude": "Latitude",
+    "Longitude": "Longitude",
+}
+
+
+def build_table(data: Direktori, idx, start_no: int = 1) -> pd.DataFrame:
+    """Tabel hasil filter (kolom berbahasa Inggris + nomor urut) untuk baris `idx`."""
+    table_df = data.take(idx).reindex(columns=list(TABLE_COLUMNS))
+    table_df["kategori_layanan"] = table_df["kategori_layanan"].map(", ".join)
+    for col in ("Nama Organisasi", "Alamat Organisasi", "Kontak Lembaga/Layanan", "Email Lembaga"):
+        table_df[col] = table_df[col].map(safe_str)
+    table_df = table_df.rename(columns=TABLE_COLUMNS)
+    table_df.insert(0, "No", range(start_no, start_no + len(table_df)))
+    return table_df
+
+
+@st.cache_resource(show_spinner=False)
+def get_table_cache() -> LRUCache:
+    return LRUCache(32)
+
+
+def cached_table(data: Direktori, key: tuple, idx) -> pd.DataFrame:
+    cache = get_table_cache()
+    table_df = cache.get(key)
+    if table_df is None:
+        table_df = build_table(data, idx)
+        cache.put(key, table_df)
+    return table_df
+
+
+@st.cache_resource(show_spinner=False)
+def get_cluster_cache() -> LRUCache:
+    return LRUCache(64)
+
+
+def cached_clusters(data: Direktori, key: tuple, idx, zoom: int) -> pd.DataFrame:
+    """Klaster peta untuk hasil filter `key` pada `zoom` (tanpa filter → agregat awal)."""
+    if len(idx) == len(data):
+        return data.cluster_index.clusters(zoom)
+    zoom = ClusterIndex.zoom_level(zoom)
+    cache = get_cluster_cache()
+    clusters = cache.get((key, zoom))
+    if clusters is None:
+        clusters = data.cluster_index.clusters(zoom, idx)
+        cache.put((key, zoom), clusters)
+    return clusters
+
+
+def _iter_table_chunks(data: Direktori, idx):
+    for start in range(0, len(idx), EXPORT_CHUNK_ROWS):
+        yield build_table(data, idx[start:start + EXPORT_CHUNK_ROWS], start_no=start + 1)
+
+
+def _write_csv(data: Direktori, idx, path: Path):
+    with path.open("w", encoding="utf-8", newline="") as f:
+        header = True
+        for chunk in _iter_table_chunks(data, idx):
+            chunk.to_csv(f, index=False, header=header)
+            header = False
+        if header:  # hasil kosong: tetap tulis header
+            build_table(data, idx[:0]).to_csv(f, index=False)
+
+
+def _write_xlsx(data: Direktori, idx, path: Path):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Direktori")
+    ws.append(["No", *TABLE_COLUMNS.values()])
+    for chunk in _iter_table_chunks(data, idx):
+        for row in chunk.itertuples(index=False):
+            ws.append([None if isinstance(v, float) and math.isnan(v) else v for v in row])
+    wb.save(path)
+
+
+def _write_parquet(data: Direktori, idx, path: Path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [("No", pa.int64())]
+        + [
+            (name, pa.float64() if name in ("Latitude", "Longitude") else pa.string())
+            for name in TABLE_COLUMNS.values()
+        ]
+    )
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in _iter_table_chunks(data, idx):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+_EXPORT_WRITERS = {"csv": _write_csv, "xlsx": _write_xlsx, "parquet": _write_parquet}
+
+
+def export_path(key: tuple, fmt: str) -> Path:
+    """Lokasi file ekspor untuk signature filter `key` (key[-1] = versi data)."""
+    ext = EXPORT_FORMATS[fmt][0]
+    sig = hashlib.blake2b(repr(key[:-1]).encode(), digest_size=8).hexdigest()
+    return EXPORT_DIR / f"{key[-1]}_{sig}.{ext}"
+
+
+def build_export(data: Direktori, key: tuple, idx, fmt: str) -> Path:
+    """Buat file ekspor kalau belum ada; ekspor versi data lama yang sudah basi dihapus.
+
+    Ekspor versi lain baru dihapus setelah EXPORT_GRACE_SECONDS: sesi yang
+    belum rerun ke versi terbaru mungkin masih akan membuka file-nya.
+    """
+    path = export_path(key, fmt)
+    if path.exists():
+        return path
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+    _EXPORT_WRITERS[EXPORT_FORMATS[fmt][0]](data, idx, tmp)
+    os.replace(tmp, path)
+    cutoff = time.time() - EXPORT_GRACE_SECONDS
+    for old in EXPORT_DIR.iterdir():
+        try:
+            if not old.name.startswith(f"{data.version}_") and old.stat().st_mtime < cutoff:
+                old.unlink()
+        except FileNotFoundError:
+            pass  # sudah dihapus proses/sesi lain
+    return path
+
+
+# ============================================================
+# 4. SUGGESTIONS (KOREKSI DATA) – SQLITE LOKAL (WAL)
+# ============================================================
+SUGGEST_COLUMNS = [
+    "id",
+    "timestamp",
+    "organisasi",
+    "pengaju",
+    "kontak",
+    "kolom",
+    "usulan",
+    "lat",
+    "lon",
+    "status",
+    "processed_at",
+    "org_id",  # ID lembaga (lihat make_org_ids); kosong untuk usulan lama
+]
+# PRAGMA user_version: 1 = skema + impor CSV, 2 = counter meta, 3 = indeks antrean,
+# 4 = tabel koreksi (overlay), 5 = keputusan deduplikasi, 6 = org_id usulan lama,
+# 7 = trigger hapus kandidat dedup
+SUGGEST_DB_VERSION = 7
+
+_SUGGEST_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS suggestions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL DEFAULT '',
+        organisasi TEXT NOT NULL DEFAULT '',
+        pengaju TEXT NOT NULL DEFAULT '',
+        kontak TEXT NOT NULL DEFAULT '',
+        kolom TEXT NOT NULL DEFAULT '',
+        usulan TEXT NOT NULL DEFAULT '',
+        lat TEXT NOT NULL DEFAULT '',
+        lon TEXT NOT NULL DEFAULT '',
+        status TEXT NOT NULL DEFAULT 'Pending',
+        processed_at TEXT NOT NULL DEFAULT '',
+        org_id TEXT NOT NULL DEFAULT ''
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_suggestions_status ON suggestions(status)",
+    "CREATE INDEX IF NOT EXISTS idx_suggestions_timestamp ON suggestions(timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_suggestions_organisasi ON suggestions(organisasi)",
+    # antrean admin: filter status + urut waktu tanpa sort terpisah
+    "CREATE INDEX IF NOT EXISTS idx_suggestions_status_timestamp "
+    "ON suggestions(status, timestamp)",
+]
+
+# Counter yang dijaga trigger: `version` naik di setiap perubahan (untuk
+# invalidasi cache), `total` = jumlah usulan (untuk metrik tanpa scan).
+_SUGGEST_META_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS suggestions_meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_suggestions_insert AFTER INSERT ON suggestions
+    BEGIN
+        UPDATE suggestions_meta SET value = value + 1 WHERE key IN ('version', 'total');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_suggestions_update AFTER UPDATE ON suggestions
+    BEGIN
+        UPDATE suggestions_meta SET value = value + 1 WHERE key = 'version';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_suggestions_delete AFTER DELETE ON suggestions
+    BEGIN
+        UPDATE suggestions_meta SET value = value + 1 WHERE key = 'version';
+        UPDATE suggestions_meta SET value = value - 1 WHERE key = 'total';
+    END
+    """,
+]
+
+
+# Koreksi dari usulan yang di-approve: satu baris per (usulan, kolom).
+# Overlay per lembaga = nilai dari usulan yang paling akhir di-approve.
+# Counter `patch` di suggestions_meta naik setiap isi overlay berubah.
+_CORRECTIONS_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS corrections (
+        suggestion_id INTEGER NOT NULL,
+        org_id TEXT NOT NULL,
+        kolom TEXT NOT NULL,
+        nilai TEXT NOT NULL,
+        applied_at TEXT NOT NULL,
+        PRIMARY KEY (suggestion_id, kolom)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_corrections_org ON corrections(org_id)",
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_corrections_insert AFTER INSERT ON corrections
+    BEGIN
+        UPDATE suggestions_meta SET value = value + 1 WHERE key = 'patch';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_corrections_delete AFTER DELETE ON corrections
+    BEGIN
+        UPDATE suggestions_meta SET value = value + 1 WHERE key = 'patch';
+    END
+    """,
+]
+
+# Pasangan kandidat duplikat (lihat bagian Deduplikasi) + keputusannya:
+# 'auto' / 'merged' = digabung, 'pending' = menunggu admin, 'separate' = bukan
+# duplikat. Disimpan per pasangan ID lembaga, jadi berlaku lintas reload.
+# 'auto' & 'pending' dinilai ulang setiap data berubah; 'merged' & 'separate'
+# (keputusan admin) tidak pernah ditimpa.
+# Counter `dedup` di suggestions_meta naik setiap isi tabel berubah.
+_DEDUP_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS dedup_pairs (
+        org_a TEXT NOT NULL,
+        org_b TEXT NOT NULL,
+        score REAL NOT NULL,
+        alasan TEXT NOT NULL DEFAULT '',
+        status TEXT NOT NULL,
+        decided_at TEXT NOT NULL DEFAULT '',
+        PRIMARY KEY (org_a, org_b)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_dedup_status ON dedup_pairs(status, score)",
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_dedup_insert AFTER INSERT ON dedup_pairs
+    BEGIN
+        UPDATE suggestions_meta SET value = value + 1 WHERE key = 'dedup';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_dedup_update AFTER UPDATE ON dedup_pairs
+    BEGIN
+        UPDATE suggestions_meta SET value = value + 1 WHERE key = 'dedup';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_dedup_delete AFTER DELETE ON dedup_pairs
+    BEGIN
+        UPDATE suggestions_meta SET value = value + 1 WHERE key = 'dedup';
+    END
+    """,
+]
+
+# Bagian (pilihan "Bagian yang ingin diubah") yang bisa diterapkan otomatis
+CORRECTABLE_COLUMNS = [
+    "Alamat Organisasi",
+    "Kontak Lembaga/Layanan",
+    "Email Lembaga",
+    "Layanan Yang Diberikan",
+    "Profil Organisasi",
+]
+COORD_COLUMNS = ("Latitude", "Longitude")
+
+
+def _now_iso() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def _read_suggestions_csv(path: Path) -> pd.DataFrame:
+    """Baca file CSV usulan format lama (sebelum SQLite)."""
+    try:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    except Exception:
+        return pd.DataFrame(columns=SUGGEST_COLUMNS)
+
+    for c in SUGGEST_COLUMNS:
+        if c not in df.columns:
+            df[c] = ""
+
+    df["id"] = pd.to_numeric(df["id"], errors="coerce")
+    if df["id"].isna().any() or df["id"].duplicated().any():
+        df["id"] = range(1, len(df) + 1)
+    df["id"] = df["id"].astype(int)
+    return df[SUGGEST_COLUMNS]
+
+
+def _backfill_org_ids(conn: sqlite3.Connection):
+    """Isi org_id usulan lama (impor CSV) dari nama lembaga di direktori.
+
+    Hanya kalau namanya cocok dengan tepat satu lembaga; sisanya tetap kosong
+    dan ditandai tidak bisa diterapkan di panel admin. Usulan Approved yang
+    terisi langsung masuk tabel koreksi.
+    """
+    rows = conn.execute("SELECT id, organisasi FROM suggestions WHERE org_id = ''").fetchall()
+    if not rows:
+        return
+    data = load_data()
+    by_name = collections.defaultdict(list)
+    for org_id, nama in zip(data.ids, data.column("Nama Organisasi")):
+        by_name[_id_part(nama)].append(org_id)
+    filled = [
+        (by_name[_id_part(nama)][0], i)
+        for i, nama in rows
+        if len(by_name.get(_id_part(nama), ())) == 1
+    ]
+    conn.executemany("UPDATE suggestions SET org_id = ? WHERE id = ?", filled)
+    _sync_corrections(conn, [i for _, i in filled])
+
+
+@contextlib.contextmanager
+def suggest_db():
+    """Koneksi SQLite ke SUGGEST_DB; commit otomatis kalau blok sukses."""
+    conn = sqlite3.connect(SUGGEST_DB, timeout=10)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SUGGEST_DB_VERSION:
+            _init_suggest_db(conn)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _init_suggest_db(conn: sqlite3.Connection):
+    """Buat/migrasi skema; impor sekali dari edit_suggestions.csv (kalau ada)."""
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        db_version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if db_version >= SUGGEST_DB_VERSION:
+            return  # sudah diinisialisasi proses/sesi lain
+        for statement in (
+            _SUGGEST_SCHEMA + _SUGGEST_META_SCHEMA + _CORRECTIONS_SCHEMA + _DEDUP_SCHEMA
+        ):
+            conn.execute(statement)
+        if db_version < 2:
+            total = conn.execute("SELECT COUNT(*) FROM suggestions").fetchone()[0]
+            conn.executemany(
+                "INSERT OR REPLACE INTO suggestions_meta (key, value) VALUES (?, ?)",
+                [("version", 1), ("total", total)],
+            )
+        if db_version < 1 and SUGGEST_PATH.exists():
+            legacy = _read_suggestions_csv(SUGGEST_PATH)
+            placeholders = ", ".join("?" * len(SUGGEST_COLUMNS))
+            conn.executemany(
+                f"INSERT OR IGNORE INTO suggestions ({', '.join(SUGGEST_COLUMNS)}) "
+                f"VALUES ({placeholders})",
+                legacy.astype(object).itertuples(index=False, name=None),
+            )
+        if db_version < 6:
+            _backfill_org_ids(conn)
+        if db_version < 4:
+            conn.execute("INSERT OR IGNORE INTO suggestions_meta (key, value) VALUES ('patch', 0)")
+            approved = [
+                r[0] for r in conn.execute("SELECT id FROM suggestions WHERE status = 'Approved'")
+            ]
+            _sync_corrections(conn, approved)
+        if db_version < 5:
+            conn.execute("INSERT OR IGNORE INTO suggestions_meta (key, value) VALUES ('dedup', 0)")
+        conn.execute(f"PRAGMA user_version = {SUGGEST_DB_VERSION}")
+
+
+def _read_suggestions(conn: sqlite3.Connection) -> pd.DataFrame:
+    return pd.read_sql_query(
+        f"SELECT {', '.join(SUGGEST_COLUMNS)} FROM suggestions ORDER BY id", conn
+    )
+
+
+def _suggest_meta(conn: sqlite3.Connection) -> dict:
+    return dict(conn.execute("SELECT key, value FROM suggestions_meta"))
+
+
+def add_suggestion(row: dict) -> int:
+    """Simpan satu usulan baru (status Pending); kembalikan ID-nya."""
+    values = {c: safe_str(row.get(c, "")) for c in SUGGEST_COLUMNS if c != "id"}
+    values["timestamp"] = values["timestamp"] or _now_iso()
+    values["status"] = values["status"] or "Pending"
+    with suggest_db() as conn:
+        cur = conn.execute(
+            f"INSERT INTO suggestions ({', '.join(values)}) "
+            f"VALUES ({', '.join('?' * len(values))})",
+            list(values.values()),
+        )
+        return int(cur.lastrowid)
+
+
+def set_suggestion_status(suggestion_id: int, status: str):
+    """Ubah status satu usulan (Approved / Rejected) + waktu diproses.
+
+    Berbeda dengan aksi massal, usulan yang sudah diproses boleh diubah lagi
+    (keputusan eksplisit admin per baris).
+    """
+    with suggest_db() as conn:
+        _set_status(conn, [suggestion_id], status)
+
+
+def _parse_coord(val, limit: float):
+    """Koordinat dari teks usulan (koma desimal boleh); None kalau tidak valid."""
+    try:
+        num = float(safe_str(val).replace(",", "."))
+    except ValueError:
+        return None
+    return num if math.isfinite(num) and -limit <= num <= limit else None
+
+
+def suggestion_patch(row: dict) -> dict:
+    """Koreksi {kolom: nilai} yang bisa diterapkan dari satu usulan.
+
+    Kalau hanya satu bagian dipilih, seluruh teks usulan menjadi nilai barunya;
+    kalau beberapa, teks usulan dibaca per baris "Nama Bagian: nilai".
+    Koordinat dipakai kalau latitude & longitude keduanya valid.
+    """
+    patch = {}
+    kolom = [
+        k.strip() for k in safe_str(row.get("kolom", "")).split(";")
+        if k.strip() in CORRECTABLE_COLUMNS
+    ]
+    usulan = safe_str(row.get("usulan", ""))
+    if usulan and len(kolom) == 1:
+        patch[kolom[0]] = usulan
+    elif usulan and kolom:
+        for line in usulan.splitlines():
+            name, sep, value = line.partition(":")
+            if sep and name.strip() in kolom and value.strip():
+                patch[name.strip()] = value.strip()
+
+    lat = _parse_coord(row.get("lat", ""), 90)
+    lon = _parse_coord(row.get("lon", ""), 180)
+    if lat is not None and lon is not None:
+        patch["Latitude"], patch["Longitude"] = lat, lon
+    return patch
+
+
+def _sync_corrections(conn: sqlite3.Connection, suggestion_ids):
+    """Samakan tabel koreksi dengan status terbaru usulan `suggestion_ids`."""
+    ids = [int(i) for i in suggestion_ids]
+    conn.executemany("DELETE FROM corrections WHERE suggestion_id = ?", [(i,) for i in ids])
+    rows = []
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        cur = conn.execute(
+            "SELECT id, org_id, kolom, usulan, lat, lon, processed_at FROM suggestions "
+            f"WHERE status = 'Approved' AND org_id != '' AND id IN ({', '.join('?' * len(chunk))})",
+            chunk,
+        )
+        names = [d[0] for d in cur.description]
+        for values in cur:
+            row = dict(zip(names, values))
+            for kolom, nilai in suggestion_patch(row).items():
+                rows.append((row["id"], row["org_id"], kolom, str(nilai), row["processed_at"]))
+    conn.executemany(
+        "INSERT INTO corrections (suggestion_id, org_id, kolom, nilai, applied_at) "
+        "VALUES (?, ?, ?, ?, ?)",
+        rows,
+    )
+
+
+def _set_status(conn: sqlite3.Connection, suggestion_ids, status: str) -> int:
+    suggestion_ids = [int(i) for i in suggestion_ids]
+    processed_at = _now_iso()
+    cur = conn.executemany(
+        "UPDATE suggestions SET status = ?, processed_at = ? WHERE id = ?",
+        [(status, processed_at, i) for i in suggestion_ids],
+    )
+    _sync_corrections(conn, suggestion_ids)
+    return cur.rowcount
+
+
+def set_suggestions_status(suggestion_ids, status: str) -> int:
+    """Proses usulan Pending di `suggestion_ids` dalam satu transaksi, satu `processed_at`.
+
+    Usulan yang sudah Approved/Rejected dilewati (sama seperti aksi per
+    filter), jadi overlay koreksinya tidak ikut berubah. Tabel koreksi ikut
+    diperbarui di transaksi yang sama.
+    """
+    ids = [int(i) for i in suggestion_ids]
+    with suggest_db() as conn:
+        pending = []
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            pending += [
+                r[0]
+                for r in conn.execute(
+                    "SELECT id FROM suggestions WHERE status = 'Pending' "
+                    f"AND id IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+            ]
+        return _set_status(conn, pending, status)
+
+
+def _suggest_where(status=None, organisasi=None, date_from=None, date_to=None):
+    """Klausa WHERE + parameter untuk filter antrean admin.
+
+    `date_from` / `date_to` berupa `datetime.date` (inklusif).
+    """
+    where, params = [], []
+    if status:
+        where.append("status = ?")
+        params.append(status)
+    if organisasi:
+        where.append("organisasi = ?")
+        params.append(organisasi)
+    if date_from:
+        where.append("timestamp >= ?")
+        params.append(date_from.isoformat())
+    if date_to:
+        where.append("timestamp < ?")
+        params.append((date_to + datetime.timedelta(days=1)).isoformat())
+    return (f"WHERE {' AND '.join(where)}" if where else ""), params
+
+
+def set_pending_status_where(status: str, organisasi=None, date_from=None, date_to=None) -> int:
+    """Proses semua usulan Pending yang cocok filter dalam satu transaksi."""
+    sql_where, params = _suggest_where("Pending", organisasi, date_from, date_to)
+    with suggest_db() as conn:
+        ids = [r[0] for r in conn.execute(f"SELECT id FROM suggestions {sql_where}", params)]
+        return _set_status(conn, ids, status)
+
+
+def read_corrections(conn: sqlite3.Connection) -> dict:
+    """Overlay {org_id: {kolom: nilai}}; usulan yang di-approve terakhir menang."""
+    overlay = collections.defaultdict(dict)
+    for org_id, kolom, nilai in conn.execute(
+        "SELECT org_id, kolom, nilai FROM corrections ORDER BY applied_at, suggestion_id"
+    ):
+        if kolom in COORD_COLUMNS:
+            overlay[org_id][kolom] = float(nilai)
+            overlay[org_id]["presisi_koordinat"] = "koreksi"
+        else:
+            overlay[org_id][kolom] = nilai
+    return dict(overlay)
+
+
+def _count_where(conn: sqlite3.Connection, sql_where: str, params) -> int:
+    if not sql_where:
+        return int(_suggest_meta(conn).get("total", 0))  # counter, tanpa scan tabel
+    return int(
+        conn.execute(f"SELECT COUNT(*) FROM suggestions {sql_where}", params).fetchone()[0]
+    )
+
+
+def count_suggestions(status=None, organisasi=None, date_from=None, date_to=None) -> int:
+    """Jumlah usulan yang cocok filter antrean admin."""
+    sql_where, params = _suggest_where(status, organisasi, date_from, date_to)
+    with suggest_db() as conn:
+        return _count_where(conn, sql_where, params)
+
+
+def suggestion_status_counts() -> dict:
+    """{status: jumlah} dari indeks status."""
+    with suggest_db() as conn:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM suggestions GROUP BY status"))
+
+
+def suggestion_organisations() -> list:
+    with suggest_db() as conn:
+        return [
+            r[0]
+            for r in conn.execute("SELECT DISTINCT organisasi FROM suggestions ORDER BY organisasi")
+            if r[0]
         ]
+
+
+def query_suggestions(
+    status=None,
+    organisasi=None,
+    date_from=None,
+    date_to=None,
+    limit: int = 20,
+    offset: int = 0,
+):
+    """Satu halaman antrean (terbaru dulu) + jumlah baris yang cocok."""
+    sql_where, params = _suggest_where(status, organisasi, date_from, date_to)
+    with suggest_db() as conn:
+        matched = _count_where(conn, sql_where, params)
+        page = pd.read_sql_query(
+            f"SELECT {', '.join(SUGGEST_COLUMNS)} FROM suggestions {sql_where} "
+            "ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+            conn,
+            params=[*params, int(limit), int(offset)],
+        )
+    return page, matched
+
+
+def read_all_suggestions() -> pd.DataFrame:
+    """Seluruh tabel usulan (urut ID), untuk unduhan CSV admin."""
+    with suggest_db() as conn:
+        return _read_suggestions(conn)
+
+
+# ------------------------------------------------------------
+# Overlay koreksi: koreksi yang di-approve ditimpakan ke data direktori saat
+# dibaca. Hanya lembaga yang koreksinya berubah yang dihitung ulang.
+# ------------------------------------------------------------
+class CorrectionOverlay:
+    """Direktori + koreksi approved, dipakai bersama semua sesi.
+
+    Versi hasil = versi data dasar + counter `patch`, jadi cache filter,
+    tabel, dan ekspor tidak tercampur dengan versi sebelum koreksi.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._base = None
+        self._patch = None
+        self._applied = {}  # org_id → {kolom: nilai} yang sudah diterapkan
+        self._current = None
+
+    def apply(self, base: Direktori) -> Direktori:
+        with self._lock:
+            with suggest_db() as conn:
+                patch = _suggest_meta(conn).get("patch", 0)
+                if base is self._base and patch == self._patch:
+                    return self._current
+                overlay = read_corrections(conn)
+
+            if base is self._base:
+                prev, applied = self._current, self._applied
+            else:
+                prev, applied = base, {}  # data dasar baru → terapkan ulang semua
+
+            updates = {}
+            for org_id in overlay.keys() | applied.keys():
+                new, old = overlay.get(org_id, {}), applied.get(org_id, {})
+                i = base.row_of(org_id)
+                if new == old or i is None:
+                    continue
+                # kolom yang koreksinya dicabut kembali ke nilai data dasar
+                updates[i] = {
+                    col: new[col] if col in new else base.column(col)[i]
+                    for col in new.keys() | old.keys()
+                    if col in base.columns
+                }
+
+            version = f"{base.version}+k{patch}" if overlay else base.version
+            if updates or version != prev.version:
+                prev = prev.with_patches(version, updates)
+            self._base, self._patch, self._applied = base, patch, overlay
+            self._current = prev
+            return prev
+
+
+@st.cache_resource(show_spinner=False)
+def get_correction_overlay() -> CorrectionOverlay:
+    return CorrectionOverlay()
+
+
+# ------------------------------------------------------------
+# Deduplikasi (entity resolution): lembaga yang sama bisa tercatat di FPL dan
+# UPTD (atau dua kali di satu sumber) dengan nama/alamat/telepon sedikit beda.
+# Kandidat dicari lewat blocking key (telepon, email, kata nama yang jarang)
+# sehingga hanya pasangan dalam blok yang sama yang dinilai (hampir linear).
+# Keputusan gabung/pisah disimpan di tabel dedup_pairs.
+# ------------------------------------------------------------
+DEDUP_MAX_BLOCK = 50  # blok lebih besar dari ini tidak informatif → dilewati
+DEDUP_MAX_KM = 50  # lebih jauh dari ini bukan duplikat (kecuali kontak sama)
+DEDUP_REVIEW_SCORE = 0.6  # ≥ ini: diusulkan ke admin
+DEDUP_AUTO_SCORE = 0.85  # ≥ ini: langsung digabung (bisa dipisah lagi oleh admin)
+DEDUP_ADMIN_PAGE = 10
+DEDUP_GENERIC_WORDS = frozenset(
+    "uptd ppa yayasan lembaga perkumpulan dan untuk the of di".split()
+)
+_PRESISI_RANK = {"sumber": 0, "koreksi": 0, "kabkota": 1, "provinsi": 2, "": 3}
+
+
+def _dedup_phones(text) -> set:
+    """Nomor telepon ternormalisasi (9 digit terakhir; +62 / 62 / tanpa 0 disamakan)."""
+    out = set()
+    for m in re.findall(r"\+?\d[\d\s\-.()]{7,}\d", safe_str(text)):
+        digits = re.sub(r"\D", "", m)
+        if digits.startswith("62"):
+            digits = "0" + digits[2:]
+        elif digits.startswith("8"):
+            digits = "0" + digits  # nol di depan hilang (kolom angka di Excel)
+        if len(digits) >= 9:
+            out.add(digits[-9:])
+    return out
+
+
+def _dedup_emails(text) -> set:
+    return set(re.findall(r"[\w.+-]+@[\w-]+\.[\w.]+", safe_str(text).lower()))
+
+
+def _dedup_words(text) -> set:
+    """Kata nama/alamat tanpa keterangan dalam kurung dan kata umum lembaga."""
+    text = re.sub(r"\(.*?\)", " ", safe_str(text).lower())
+    return {w for w in re.findall(r"[a-z0-9]+", text) if len(w) > 1 and w not in DEDUP_GENERIC_WORDS}
+
+
+def _weighted_jaccard(a: set, b: set, idf: dict) -> float:
+    union = a | b
+    if not union:
+        return 0.0
+    return sum(idf[w] for w in a & b) / sum(idf[w] for w in union)
+
+
+def dedup_candidates(data: Direktori) -> list:
+    """[(org_a, org_b, skor, alasan)] untuk pasangan dengan skor ≥ DEDUP_REVIEW_SCORE.
+
+    Skor = 0.6 × kemiripan nama (Jaccard berbobot IDF) + 0.3 × kontak sama
+    (telepon/email) + 0.1 × kemiripan alamat. Pasangan dengan provinsi atau
+    kab/kota tercatat yang berbeda, atau berjarak > DEDUP_MAX_KM tanpa kontak
+    yang sama, tidak dinilai.
+    """
+    n = len(data)
+    names = [_dedup_words(v) for v in data.column("Nama Organisasi")]
+    addrs = [_dedup_words(v) for v in data.column("Alamat Organisasi")]
+    phones = [_dedup_phones(v) for v in data.column("Kontak Lembaga/Layanan")]
+    emails = [_dedup_emails(v) for v in data.column("Email Lembaga")]
+    regions = list(zip(
+        map(_wilayah_key, data.column("Provinsi")),
+        map(_wilayah_key, data.column("Kabupaten/Kota")),
+    ))
+
+    df = collections.Counter(w for words in names + addrs for w in words)
+    idf = {w: math.log(1 + n / c) for w, c in df.items()}
+
+    blocks = collections.defaultdict(list)
+    for i in range(n):
+        for p in phones[i]:
+            blocks["t", p].append(i)
+        for e in emails[i]:
+            blocks["e", e].append(i)
+        for w in names[i]:
+            blocks["n", w].append(i)
+    pairs = set()
+    for rows in blocks.values():
+        if 1 < len(rows) <= DEDUP_MAX_BLOCK:
+            pairs.update(itertools.combinations(rows, 2))
+
+    lat, lon = data.column("Latitude"), data.column("Longitude")
+    out = []
+    for a, b in sorted(pairs):
+        if any(ra and rb and ra != rb for ra, rb in zip(regions[a], regions[b])):
+            continue
+        shared = sorted(phones[a] & phones[b]) + sorted(emails[a] & emails[b])
+        if not shared and np.isfinite([lat[a], lon[a], lat[b], lon[b]]).all():
+            km = data.spatial_index.distance_km([a], lat[b], lon[b])[0]
+            if km > DEDUP_MAX_KM:
+                continue
+        name_sim = _weighted_jaccard(names[a], names[b], idf)
+        score = 0.6 * name_sim + 0.3 * bool(shared) + 0.1 * _weighted_jaccard(addrs[a], addrs[b], idf)
+        if score >= DEDUP_REVIEW_SCORE:
+            alasan = f"nama {name_sim:.0%}" + (f", kontak sama ({shared[0]})" if shared else "")
+            id_a, id_b = sorted((data.ids[a], data.ids[b]))
+            out.append((id_a, id_b, round(score, 4), alasan))
+    return out
+
+
+def record_dedup_candidates(conn: sqlite3.Connection, candidates) -> int:
+    """Samakan pasangan 'auto'/'pending' dengan hasil `dedup_candidates` terbaru.
+
+    Pasangan baru ditambahkan; skor, alasan, dan status pasangan yang belum
+    diputuskan admin diperbarui (turun di bawah DEDUP_AUTO_SCORE → kembali
+    'pending'); yang tidak lagi jadi kandidat dihapus. Keputusan admin
+    ('merged' / 'separate') tidak diubah. Kembalikan jumlah baris yang berubah.
+    """
+    cur = conn.executemany(
+        """
+        INSERT INTO dedup_pairs (org_a, org_b, score, alasan, status) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (org_a, org_b) DO UPDATE SET
+            score = excluded.score, alasan = excluded.alasan, status = excluded.status
+        WHERE dedup_pairs.status IN ('auto', 'pending')
+            AND (dedup_pairs.score != excluded.score OR dedup_pairs.alasan != excluded.alasan
+                 OR dedup_pairs.status != excluded.status)
+        """,
+        [
+            (a, b, score, alasan, "auto" if score >= DEDUP_AUTO_SCORE else "pending")
+            for a, b, score, alasan in candidates
+        ],
+    )
+    changed = cur.rowcount
+    current = {(a, b) for a, b, *_ in candidates}
+    stale = [
+        pair
+        for pair in conn.execute(
+            "SELECT org_a, org_b FROM dedup_pairs WHERE status IN ('auto', 'pending')"
+        )
+        if pair not in current
     ]
+    conn.executemany("DELETE FROM dedup_pairs WHERE org_a = ? AND org_b = ?", stale)
+    return changed + len(stale)
 
 
-def load_uptd_prov() -> pd.DataFrame:
-    raw = _read_excel_safe(UPTD_XLSX, sheet_name="UPTD PPA Provinsi")
-    if raw is None:
-        return pd.DataFrame()
+def read_dedup_merges(conn: sqlite3.Connection) -> list:
+    return conn.execute(
+        "SELECT org_a, org_b FROM dedup_pairs WHERE status IN ('auto', 'merged')"
+    ).fetchall()
 
-    df = raw.iloc[3:].copy()
-    df = df.rename(
-        columns={
-            0: "NO",
-            1: "PROVINSI",
-            3: "ALAMAT_KANTOR",
-            4: "TELP_KANTOR",
-            5: "HOTLINE",
-        }
-    )
-    df = df[df["PROVINSI"].notna()]
-
-    prov_clean = (
-        df["PROVINSI"]
-        .astype(str)
-        .str.replace(r"^PROVINSI\\s+", "", regex=True)
-        .str.title()
-    )
-
-    out = pd.DataFrame()
-    out["Nama Organisasi"] = "UPTD PPA " + prov_clean
-    out["Alamat Organisasi"] = df["ALAMAT_KANTOR"]
-    out["Kontak Lembaga/Layanan"] = df["HOTLINE"].replace({0: np.nan}).fillna(
-        df["TELP_KANTOR"]
-    )
-    out["Email Lembaga"] = ""
-    out["Profil Organisasi"] = "UPTD PPA tingkat provinsi di Provinsi " + prov_clean
-    out["Layanan Yang Diberikan"] = (
-        "Layanan pengaduan; konseling psikologis; pendampingan hukum; rujukan layanan."
-    )
-    out["Sumber Data"] = "UPTD PPA Provinsi"
-    out["Latitude"] = np.nan
-    out["Longitude"] = np.nan
 
-    return out
+def set_dedup_status(org_a: str, org_b: str, status: str):
+    """Keputusan admin untuk satu pasangan: 'merged' / 'separate' / 'pending'."""
+    with suggest_db() as conn:
+        conn.execute(
+            "UPDATE dedup_pairs SET status = ?, decided_at = ? WHERE org_a = ? AND org_b = ?",
+            (status, _now_iso(), org_a, org_b),
+        )
 
 
-def load_uptd_kabkota() -> pd.DataFrame:
-    raw = _read_excel_safe(UPTD_XLSX, sheet_name="UPTD PPA KabKota")
-    if raw is None:
-        return pd.DataFrame()
+def _dedup_component(merges, org_id: str) -> dict:
+    """{ID: ID sebelumnya di jalur BFS} untuk kelompok gabungan yang memuat org_id."""
+    graph = collections.defaultdict(list)
+    for a, b in merges:
+        graph[a].append(b)
+        graph[b].append(a)
+    parent = {org_id: None}
+    queue = collections.deque([org_id])
+    while queue:
+        node = queue.popleft()
+        for other in graph[node]:
+            if other not in parent:
+                parent[other] = node
+                queue.append(other)
+    return parent
+
+
+def dedup_link(org_a: str, org_b: str) -> list:
+    """Pasangan digabung yang masih menghubungkan org_a dan org_b ([] = sudah terpisah).
+
+    Union-find menggabungkan semua pasangan dalam satu kelompok, jadi memisahkan
+    satu pasangan tidak cukup kalau keduanya masih tersambung lewat lembaga lain.
+    """
+    with suggest_db() as conn:
+        parent = _dedup_component(read_dedup_merges(conn), org_a)
+    path, node = [], org_b
+    while node in parent and parent[node] is not None:
+        path.append(tuple(sorted((parent[node], node))))
+        node = parent[node]
+    return path[::-1]
+
+
+def split_dedup_component(org_id: str) -> int:
+    """Tandai 'separate' semua pasangan digabung di kelompok org_id; jumlahnya."""
+    with suggest_db() as conn:
+        merges = read_dedup_merges(conn)
+        members = _dedup_component(merges, org_id)
+        pairs = [(a, b) for a, b in merges if a in members]
+        decided_at = _now_iso()
+        conn.executemany(
+            "UPDATE dedup_pairs SET status = 'separate', decided_at = ? "
+            "WHERE org_a = ? AND org_b = ?",
+            [(decided_at, a, b) for a, b in pairs],
+        )
+    return len(pairs)
 
-    df = raw.iloc[3:].copy()
-    df = df.rename(
-        columns={
-            0: "PROVINSI",
-            2: "KABKOTA",
-            4: "ALAMAT_KANTOR",
-            5: "TELP_KANTOR",
-            6: "HOTLINE",
-        }
-    )
 
-    df = df[df["KABKOTA"].notna()]
-    df = df[df["KABKOTA"] != "(4)"]  # buang baris header nyasar
+def dedup_counts() -> dict:
+    with suggest_db() as conn:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM dedup_pairs GROUP BY status"))
 
-    prov_clean = (
-        df["PROVINSI"]
-        .astype(str)
-        .str.replace(r"^Provinsi\\s+", "", regex=True)
-        .str.title()
-    )
-    kab_clean = df["KABKOTA"].astype(str).str.title()
-
-    out = pd.DataFrame()
-    out["Nama Organisasi"] = "UPTD PPA " + kab_clean + " (" + prov_clean + ")"
-    out["Alamat Organisasi"] = df["ALAMAT_KANTOR"]
-    out["Kontak Lembaga/Layanan"] = df["HOTLINE"].fillna(df["TELP_KANTOR"])
-    out["Email Lembaga"] = ""
-    out["Profil Organisasi"] = (
-        "UPTD PPA tingkat kabupaten/kota di " + kab_clean + ", Provinsi " + prov_clean
-    )
-    out["Layanan Yang Diberikan"] = (
-        "Layanan pengaduan; konseling psikologis; pendampingan hukum; rujukan layanan."
-    )
-    out["Sumber Data"] = "UPTD PPA Kab/Kota"
-    out["Latitude"] = np.nan
-    out["Longitude"] = np.nan
 
-    return out
+def dedup_queue(statuses, limit: int = DEDUP_ADMIN_PAGE) -> pd.DataFrame:
+    """Pasangan dengan status di `statuses`, skor tertinggi dulu."""
+    marks = ", ".join("?" * len(statuses))
+    with suggest_db() as conn:
+        return pd.read_sql_query(
+            f"SELECT org_a, org_b, score, alasan, status FROM dedup_pairs "
+            f"WHERE status IN ({marks}) ORDER BY score DESC, org_a, org_b LIMIT ?",
+            conn,
+            params=[*statuses, int(limit)],
+        )
 
 
-@st.cache_data(show_spinner=False)
-def load_data() -> pd.DataFrame:
-    """Gabungkan FPL + UPTD PPA Provinsi + UPTD PPA Kab/Kota, plus kategori layanan."""
-    fpl = load_fpl()
-    uptd_prov = load_uptd_prov()
-    uptd_kab = load_uptd_kabkota()
+def _join_distinct(values) -> str:
+    seen = dict.fromkeys(v for v in (safe_str(x).strip() for x in values) if v)
+    return "; ".join(seen)
 
-    df = pd.concat([fpl, uptd_prov, uptd_kab], ignore_index=True, sort=False)
 
-    raw_text = (
-        df.get("Layanan Yang Diberikan", "")
-        .fillna("")
-        .astype(str)
-        .str.replace("\n", " ")
-    )
+def merge_duplicates(base: Direktori, merges) -> tuple:
+    """(frame gabungan, ID lembaga per barisnya, {ID yang digabung: ID utama}).
 
-    df["layanan_list"] = raw_text.apply(
-        lambda t: [p.strip() for p in t.split(";") if p.strip()]
-    )
-    df["kategori_layanan"] = raw_text.apply(_extract_kategori)
+    Tiap klaster (union-find atas pasangan `merges`) jadi satu baris: baris
+    utama = yang alamatnya terisi & datanya paling lengkap. Baris utama tetap
+    memakai ID-nya dari `base` (tidak dihitung ulang: ID kembar "X-2" bisa
+    bergeser jadi "X" kalau "X" ikut digabung); kontak & email digabung,
+    kolom kosong diisi dari baris lain, koordinat diambil yang paling presisi.
+    """
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in merges:
+        ia, ib = base.row_of(a), base.row_of(b)
+        if ia is not None and ib is not None:
+            parent[find(ia)] = find(ib)
+    clusters = collections.defaultdict(list)
+    for i in list(parent):
+        clusters[find(i)].append(i)
+
+    frame = base.take(base.all_index())
+    if "digabung_dari" not in frame:
+        frame["digabung_dari"] = ""
+    drop, aliases = [], {}
+    filled = frame.notna() & frame.astype(str).ne("")
+    for rows in clusters.values():
+        rows.sort()
+        main = max(rows, key=lambda i: (
+            bool(safe_str(frame.at[i, "Alamat Organisasi"])), int(filled.loc[i].sum()), -i
+        ))
+        others = [i for i in rows if i != main]
+        for col in ("Kontak Lembaga/Layanan", "Email Lembaga"):
+            frame.at[main, col] = _join_distinct(frame.loc[[main, *others], col])
+        for col in ("Profil Organisasi", "Layanan Yang Diberikan"):
+            if not safe_str(frame.at[main, col]):
+                donor = next((i for i in others if safe_str(frame.at[i, col])), None)
+                if donor is not None:
+                    frame.at[main, col] = frame.at[donor, col]
+                    if col == "Layanan Yang Diberikan" and "layanan_list" in frame:
+                        frame.at[main, "layanan_list"] = frame.at[donor, "layanan_list"]
+        frame.at[main, "kategori_layanan"] = tuple(
+            dict.fromkeys(k for i in rows for k in frame.at[i, "kategori_layanan"])
+        )
+        if "presisi_koordinat" in frame:
+            best = min(rows, key=lambda i: (_PRESISI_RANK.get(frame.at[i, "presisi_koordinat"], 3), i))
+            for col in ("Latitude", "Longitude", "presisi_koordinat"):
+                frame.at[main, col] = frame.at[best, col]
+        frame.at[main, "digabung_dari"] = _join_distinct(
+            f"{safe_str(frame.at[i, 'Nama Organisasi'])} ({safe_str(frame.at[i, 'Sumber Data'])})"
+            for i in others
+        )
+        drop.extend(others)
+        aliases.update({base.ids[i]: base.ids[main] for i in others})
+    ids = np.delete(base.ids, drop)
+    return frame.drop(index=drop).reset_index(drop=True), ids, aliases
 
-    for col in [
-        "Nama Organisasi",
-        "Alamat Organisasi",
-        "Kontak Lembaga/Layanan",
-        "Email Lembaga",
-        "Profil Organisasi",
-        "Sumber Data",
-        "Latitude",
-        "Longitude",
-    ]:
-        if col not in df.columns:
-            df[col] = ""
 
-    return df
+class DedupStage:
+    """Direktori dengan duplikat yang sudah diputuskan digabung.
 
+    Kandidat dihitung sekali per versi data dasar lalu dicatat ke dedup_pairs;
+    hasil gabungan dibangun ulang hanya kalau data dasar atau counter `dedup`
+    berubah. Versi hasil = versi data dasar + counter `dedup`.
+    """
 
-# ============================================================
-# 4. SUGGESTIONS (KOREKSI DATA) – LOCAL CSV ONLY
-# ============================================================
-def load_suggestions() -> pd.DataFrame:
-    required_cols = [
-        "id",
-        "timestamp",
-        "organisasi",
-        "pengaju",
-        "kontak",
-        "kolom",
-        "usulan",
-        "lat",
-        "lon",
-        "status",
-        "processed_at",
-    ]
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._base = None
+        self._counter = None
+        self._current = None
 
-    if SUGGEST_PATH.exists():
-        try:
-            df = pd.read_csv(SUGGEST_PATH)
-        except Exception:
-            df = pd.DataFrame(columns=required_cols)
-    else:
-        df = pd.DataFrame(columns=required_cols)
+    def apply(self, base: Direktori) -> Direktori:
+        with self._lock:
+            with suggest_db() as conn:
+                if base is not self._base:
+                    record_dedup_candidates(conn, dedup_candidates(base))
+                counter = _suggest_meta(conn).get("dedup", 0)
+                if base is self._base and counter == self._counter:
+                    return self._current
+                merges = read_dedup_merges(conn)
 
-    for c in required_cols:
-        if c not in df.columns:
-            df[c] = ""
+            current = base
+            if merges:
+                frame, ids, aliases = merge_duplicates(base, merges)
+                if aliases:
+                    current = Direktori(f"{base.version}+d{counter}", frame, ids=ids)
+                    current = current.with_aliases(aliases)
+            self._base, self._counter, self._current = base, counter, current
+            return current
 
-    df["id"] = pd.to_numeric(df.get("id"), errors="coerce")
-    if df["id"].isna().any():
-        df["id"] = range(1, len(df) + 1)
 
-    return df[required_cols]
+@st.cache_resource(show_spinner=False)
+def get_dedup_stage() -> DedupStage:
+    return DedupStage()
 
 
-def save_suggestions(df_sug: pd.DataFrame):
-    df_sug.to_csv(SUGGEST_PATH, index=False)
+def load_corrected_data() -> Direktori:
+    """`load_data()` + duplikat yang digabung + koreksi yang sudah di-approve."""
+    return get_correction_overlay().apply(get_dedup_stage().apply(load_data()))
 
 
 # ============================================================
 # 5. INIT STATE & LOAD DF
 # ============================================================
-df = load_data()
+data = load_corrected_data()
+for msg in get_data_store().warnings():
+    st.warning(msg)
 
 if "page" not in st.session_state:
     st.session_state["page"] = 1
-if "koreksi_target_org" not in st.session_state:
-    st.session_state["koreksi_target_org"] = None
-if "koreksi_hint" not in st.session_state:
-    st.session_state["koreksi_hint"] = None
+if "koreksi_target_id" not in st.session_state:
+    st.session_state["koreksi_target_id"] = None
 if "show_detail" not in st.session_state:
     st.session_state["show_detail"] = False
-if "detail_org" not in st.session_state:
-    st.session_state["detail_org"] = None
+if "detail_id" not in st.session_state:
+    st.session_state["detail_id"] = None
+if "map_view" not in st.session_state:
+    st.session_state["map_view"] = MAP_DEFAULT_VIEW
+
+# Widget di halaman yang tidak sedang dibuka tidak dirender, dan Streamlit
+# membuang state-nya. Nilainya ditulis ulang di sini supaya filter, pilihan
+# halaman, dll. tetap sama saat pengguna kembali ke halaman tersebut.
+WIDGET_DEFAULTS = {
+    "filter_name": "",
+    "filter_addr": "",
+    "filter_text": "",
+    "filter_fuzzy": False,
+    "filter_categories": [],
+    "near_on": False,
+    "near_lat": -6.2,
+    "near_lon": 106.8,
+    "near_mode": "Terdekat",
+    "near_k": 10,
+    "near_radius": 25,
+    "page_size": PAGE_SIZE_OPTIONS[0],
+    "export_fmt": next(iter(EXPORT_FORMATS)),
+    "admin_pwd": "",
+    "admin_status": "Pending",
+    "admin_org": "Semua",
+}
+for _key, _default in WIDGET_DEFAULTS.items():
+    st.session_state[_key] = st.session_state.get(_key, _default)
 
 # ============================================================
 # 6. HEADER
@@ -454,416 +2872,419 @@ with title_col:
 
 st.divider()
 
-# Info setelah klik "Usulkan koreksi"
-if st.session_state.get("koreksi_hint"):
-    st.info(st.session_state["koreksi_hint"])
-
 # ============================================================
-# 7. TABS
+# 7. HALAMAN
+# Tiap halaman = satu fungsi; hanya halaman yang sedang dibuka yang
+# dijalankan (lihat NAVIGASI di bagian akhir file).
 # ============================================================
-tab_dir, tab_koreksi, tab_admin, tab_about = st.tabs(
-    ["📊 Direktori", "✏️ Koreksi Data", "🗂️ Admin", "ℹ️ Tentang"]
-)
 
 # ============================================================
-# TAB: DIREKTORI
+# HALAMAN: DIREKTORI
 # ============================================================
-with tab_dir:
-    # Heading dengan anchor dan ikon link sederhana
-    st.markdown(
-        """
-        <h3 id="direktori-layanan" style="margin-bottom:0.75rem;">
-          📊 Direktori Layanan
-          <a href="#direktori-layanan" style="text-decoration:none;">↪</a>
-        </h3>
-        """,
-        unsafe_allow_html=True,
-    )
+def _reset_filter():
+    for key in (
+        "filter_name", "filter_addr", "filter_text", "filter_fuzzy", "filter_categories", "near_on"
+    ):
+        st.session_state[key] = WIDGET_DEFAULTS[key]
+    st.session_state["page"] = 1
+    st.session_state["show_detail"] = False
+    st.session_state["detail_id"] = None
 
-    fcol1, fcol2 = st.columns([1, 3])
 
-    # ---------- FILTER ----------
-    with fcol1:
-        st.markdown("#### 🔎 Filter")
-        name = st.text_input("Cari Nama Organisasi")
-        addr = st.text_input("Cari Alamat / Daerah")
-
-        all_categories = sorted({c for cats in df["kategori_layanan"] for c in cats})
-        selected_categories = st.multiselect("Kategori Layanan", all_categories)
-
-        if st.button("Reset filter", use_container_width=True):
-            name = ""
-            addr = ""
-            selected_categories = []
-            st.session_state["page"] = 1
-            st.session_state["show_detail"] = False
-            st.session_state["detail_org"] = None
-            st.session_state["koreksi_hint"] = None
-            st.rerun()
-
-    filtered = df.copy()
-    if name:
-        filtered = filtered[
-            filtered["Nama Organisasi"].fillna("").str.contains(name, case=False, na=False)
-        ]
-    if addr:
-        filtered = filtered[
-            filtered["Alamat Organisasi"].fillna("").str.contains(addr, case=False, na=False)
-        ]
+# ------------------------------------------------------------
+# Fragment: grid card (+ pagination), panel detail, dan form koreksi cepat
+# dijalankan ulang sendiri-sendiri. Klik di dalamnya hanya merender ulang
+# fragment tersebut, bukan filter, tabel, atau bagian halaman lain.
+# ------------------------------------------------------------
+def _goto_page(page: int):
+    st.session_state["page"] = page
+    st.session_state["show_detail"] = False
+    st.session_state["detail_id"] = None
+
+
+def _show_detail(org_id):
+    st.session_state["detail_id"] = org_id
+    st.session_state["show_detail"] = True
+
 
-    if selected_categories:
-        def has_cat(lst):
-            return any(c in lst for c in selected_categories)
-        filtered = filtered[filtered["kategori_layanan"].apply(has_cat)]
+def _close_detail():
+    st.session_state["show_detail"] = False
+    st.session_state["detail_id"] = None
 
-    total_count = len(df)
-    filtered_count = len(filtered)
 
-    # ---------- PAGINATION ----------
-    page_size = 10
+@st.fragment
+def direktori_grid(filtered_idx, page_size: int, near=None):
+    """Jumlah hasil, pagination, card satu halaman, dan panel detail."""
+    filtered_count = len(filtered_idx)
     total_pages = max(1, math.ceil(max(filtered_count, 1) / page_size))
+    page = min(max(st.session_state["page"], 1), total_pages)
+    st.session_state["page"] = page
 
-    if st.session_state["page"] > total_pages:
-        st.session_state["page"] = total_pages
-    if st.session_state["page"] < 1:
-        st.session_state["page"] = 1
+    st.markdown(
+        f"Menampilkan **{filtered_count}** dari **{len(data)}** lembaga"
+    )
 
-    with fcol1:
-        if filtered_count > 0:
-            st.markdown("#### Halaman")
-            prev_col, mid_col, next_col = st.columns([1, 2, 1])
-            with prev_col:
-                if st.button("◀", disabled=st.session_state["page"] <= 1):
-                    st.session_state["page"] -= 1
-                    st.session_state["show_detail"] = False
-                    st.session_state["detail_org"] = None
-                    st.rerun()
-            with mid_col:
-                st.markdown(
-                    f"<div style='text-align:center; padding-top:4px;'>Halaman "
-                    f"<b>{st.session_state['page']}</b> dari {total_pages}</div>",
-                    unsafe_allow_html=True,
-                )
-            with next_col:
-                if st.button("▶", disabled=st.session_state["page"] >= total_pages):
-                    st.session_state["page"] += 1
-                    st.session_state["show_detail"] = False
-                    st.session_state["detail_org"] = None
-                    st.rerun()
-
-    # ---------- CARD LIST ----------
-    with fcol2:
-        st.markdown(
-            f"Menampilkan **{filtered_count}** dari **{total_count}** lembaga"
+    if filtered_count > 0:
+        prev_col, mid_col, next_col = st.columns([1, 2, 1])
+        with prev_col:
+            st.button("◀", disabled=page <= 1, on_click=_goto_page, args=(page - 1,))
+        with mid_col:
+            st.markdown(
+                f"<div style='text-align:center; padding-top:4px;'>Halaman "
+                f"<b>{page}</b> dari {total_pages}</div>",
+                unsafe_allow_html=True,
+            )
+        with next_col:
+            st.button("▶", disabled=page >= total_pages, on_click=_goto_page, args=(page + 1,))
+    st.markdown("---")
+
+    if filtered_count == 0:
+        st.info("Belum ada lembaga yang cocok dengan filter.")
+    else:
+        start_idx = (page - 1) * page_size
+        end_idx = start_idx + page_size
+        page_rows = filtered_idx[start_idx:end_idx]
+        card_html = data.card_html
+        page_dist = (
+            data.spatial_index.distance_km(page_rows, near[0], near[1])
+            if near
+            else None
         )
-        st.markdown("---")
 
-        if filtered_count == 0:
-            st.info("Belum ada lembaga yang cocok dengan filter.")
-        else:
-            cards_df = filtered.reset_index(drop=True)
-            page = st.session_state["page"]
-            start_idx = (page - 1) * page_size
-            end_idx = start_idx + page_size
-            page_df = cards_df.iloc[start_idx:end_idx]
+        st.caption(
+            f"Menampilkan lembaga nomor {start_idx+1}–"
+            f"{min(end_idx, filtered_count)} dari {filtered_count} hasil."
+        )
 
-            st.caption(
-                f"Menampilkan lembaga nomor {start_idx+1}–"
-                f"{min(end_idx, len(cards_df))} dari {len(cards_df)} hasil."
-            )
+        n_cols = 2 if len(page_rows) > 1 else 1
+
+        for i in range(0, len(page_rows), n_cols):
+            cols = st.columns(n_cols)
+
+            for j, (col, row_id) in enumerate(zip(cols, page_rows[i:i + n_cols])):
+                with col:
+                    org_id = data.ids[row_id]
+                    st.markdown(card_html[row_id], unsafe_allow_html=True)
+                    if page_dist is not None:
+                        st.caption(f"📍 ± {page_dist[i + j]:.1f} km dari titik pencarian")
+
+                    bcol1, bcol2 = st.columns(2)
+
+                    # Tombol usulan koreksi → form koreksi cepat untuk lembaga ini (dialog)
+                    with bcol1:
+                        if st.button(
+                            "✏️ Usulkan koreksi",
+                            key=f"suggest_{org_id}",
+                            use_container_width=True,
+                        ):
+                            st.session_state["koreksi_target_id"] = org_id
+                            quick_suggest_dialog(org_id)
+
+                    with bcol2:
+                        st.button(
+                            "👁 Lihat detail",
+                            key=f"detail_{org_id}",
+                            on_click=_show_detail,
+                            args=(org_id,),
+                            use_container_width=True,
+                        )
 
-            n_cols = 2 if len(page_df) > 1 else 1
+    detail_panel()
 
-            for i in range(0, len(page_df), n_cols):
-                cols = st.columns(n_cols)
-                chunk = page_df.iloc[i:i + n_cols]
 
-                for col, (idx_row, row) in zip(cols, chunk.iterrows()):
-                    with col:
-                        nama = safe_str(row.get("Nama Organisasi", ""))
-                        alamat = safe_str(row.get("Alamat Organisasi", ""))
-                        kontak = safe_str(row.get("Kontak Lembaga/Layanan", ""))
-                        email = safe_str(row.get("Email Lembaga", ""))
-                        kategori = row.get("kategori_layanan", [])
-                        sumber = safe_str(row.get("Sumber Data", ""))
+@st.fragment
+def detail_panel():
+    """Profil lengkap lembaga yang dipilih lewat "Lihat detail"."""
+    detail_id = st.session_state.get("detail_id")
+    detail_row = data.row_of(detail_id) if st.session_state.get("show_detail") else None
+    if detail_row is None:
+        return
+    r = data.row(detail_row)
+    sumber = safe_str(r.get("Sumber Data", ""))
+    badge_html = get_source_badge_html(sumber)
 
-                        if isinstance(kategori, str):
-                            kategori_list = [
-                                k.strip() for k in kategori.split(",") if k.strip()
-                            ]
-                        else:
-                            kategori_list = kategori or []
+    st.markdown("---")
+    st.markdown("#### 👁 Profil Lembaga (Detail)")
+    st.markdown(
+        f"<div style='display:flex; justify-content:space-between; align-items:flex-start; gap:0.5rem;'>"
+        f"<div><b>{safe_str(r.get('Nama Organisasi', ''))}</b></div>"
+        f"<div>{badge_html}</div>"
+        f"</div>",
+        unsafe_allow_html=True,
+    )
 
-                        alamat_disp = alamat if len(alamat) <= 200 else alamat[:200] + "…"
+    col_a, col_b = st.columns([2, 1])
+    with col_a:
+        st.markdown("**Alamat**")
+        st.write(safe_str(r.get("Alamat Organisasi", "")) or "—")
+
+        st.markdown("**Kontak Layanan**")
+        st.write(safe_str(r.get("Kontak Lembaga/Layanan", "")) or "—")
+
+        st.markdown("**Email Layanan**")
+        st.write(safe_str(r.get("Email Lembaga", "")) or "—")
+
+        st.markdown("**Profil Organisasi**")
+        st.write(safe_str(r.get("Profil Organisasi", "")) or "—")
+
+        digabung = safe_str(r.get("digabung_dari", ""))
+        if digabung:
+            st.markdown("**Juga tercatat sebagai**")
+            for item in digabung.split("; "):
+                st.write(f"- {item}")
+
+    with col_b:
+        st.markdown("**Koordinat Lokasi**")
+        lat = safe_str(r.get("Latitude", ""))
+        lon = safe_str(r.get("Longitude", ""))
+        if lat and lon:
+            st.write(f"Lat: `{lat}`, Lon: `{lon}`")
+            presisi = PRESISI_KOORDINAT.get(safe_str(r.get("presisi_koordinat", "")))
+            if presisi:
+                st.caption(presisi)
+        else:
+            st.write(
+                "Belum ada koordinat latitude/longitude. "
+                "Dapat diusulkan melalui koreksi data."
+            )
 
-                        tags_html = "".join(
-                            f'<span class="tag">{cat}</span>' for cat in kategori_list
-                        )
-                        badge_html = get_source_badge_html(sumber)
-
-                        card_html = f"""
-                        <div class="org-card">
-                            <div style="display:flex; justify-content:space-between; align-items:flex-start; gap:0.5rem;">
-                                <div class="org-name">{nama}</div>
-                                <div>{badge_html}</div>
-                            </div>
-                            <div class="org-address">{alamat_disp}</div>
-                            <div class="org-meta">
-                                <span class="label">Service Contact:</span>
-                                {'-' if not kontak else kontak}
-                            </div>
-                            <div class="org-meta">
-                                <span class="label">Service Email:</span>
-                                {'-' if not email else email}
-                            </div>
-                            <div class="org-meta">
-                                <span class="label">Service Categories:</span><br/>
-                                {tags_html if tags_html else '<span class="tag">Not specified</span>'}
-                            </div>
-                        </div>
-                        """
-                        st.markdown(card_html, unsafe_allow_html=True)
-
-                        bcol1, bcol2 = st.columns(2)
-
-                        # Tombol usulan koreksi → simpan target + pesan dengan link ke anchor form
-                        with bcol1:
-                            if st.button(
-                                "✏️ Usulkan koreksi",
-                                key=f"suggest_{start_idx + idx_row}",
-                                use_container_width=True,
-                            ):
-                                st.session_state["koreksi_target_org"] = nama
-                                st.session_state["koreksi_hint"] = (
-                                    f"Lembaga **{nama}** sudah otomatis dipilih di bagian "
-                                    "[Usulan Koreksi Cepat](#usulan-koreksi-cepat)."
-                                )
-                                st.rerun()
-
-                        with bcol2:
-                            if st.button(
-                                "👁 Lihat detail",
-                                key=f"detail_{start_idx + idx_row}",
-                                use_container_width=True,
-                            ):
-                                st.session_state["detail_org"] = nama
-                                st.session_state["show_detail"] = True
-                                st.rerun()
-
-        # ---------- DETAIL SECTION ----------
-        if st.session_state.get("show_detail") and st.session_state.get("detail_org"):
-            org_name = st.session_state["detail_org"]
-            detail_df = df[df["Nama Organisasi"] == org_name]
-            if not detail_df.empty:
-                r = detail_df.iloc[0]
-                sumber = safe_str(r.get("Sumber Data", ""))
-                badge_html = get_source_badge_html(sumber)
-
-                st.markdown("---")
-                st.markdown("#### 👁 Profil Lembaga (Detail)")
-                st.markdown(
-                    f"<div style='display:flex; justify-content:space-between; align-items:flex-start; gap:0.5rem;'>"
-                    f"<div><b>{safe_str(r.get('Nama Organisasi', ''))}</b></div>"
-                    f"<div>{badge_html}</div>"
-                    f"</div>",
-                    unsafe_allow_html=True,
-                )
+        st.markdown("**Kategori Layanan**")
+        kat = r.get("kategori_layanan", [])
+        if isinstance(kat, (list, tuple)) and kat:
+            for c in kat:
+                st.markdown(f"- {c}")
+        else:
+            st.write("—")
 
-                col_a, col_b = st.columns([2, 1])
-                with col_a:
-                    st.markdown("**Alamat**")
-                    st.write(safe_str(r.get("Alamat Organisasi", "")) or "—")
+    st.markdown("**Layanan yang diberikan**")
+    layanan_list = r.get("layanan_list", [])
+    if isinstance(layanan_list, (list, tuple)) and layanan_list:
+        for item in layanan_list:
+            st.write(f"- {safe_str(item)}")
+    else:
+        st.write("—")
+
+    st.button("Tutup detail", key="close_detail_section", on_click=_close_detail)
+
+
+SUGGEST_FIELD_OPTIONS = [
+    "Alamat Organisasi",
+    "Kontak Lembaga/Layanan",
+    "Email Lembaga",
+    "Layanan Yang Diberikan",
+    "Profil Organisasi",
+    "Koordinat (Latitude/Longitude)",
+    "Lainnya",
+]
+
+
+def _quick_suggest_form(form_key: str, org_id=None):
+    """Form koreksi cepat; `org_id` = lembaga tetap (tanpa pilihan lembaga)."""
+    with st.form(form_key):
+        if org_id is None:
+            org_options_quick = data.org_options
+            default_org_q = st.session_state.get("koreksi_target_id")
+            if default_org_q in org_options_quick:
+                default_index_q = org_options_quick.index(default_org_q)
+            else:
+                default_index_q = 0
+            org_id = st.selectbox(
+                "Pilih lembaga yang ingin dikoreksi",
+                org_options_quick,
+                index=default_index_q,
+                format_func=data.label,
+            )
+        else:
+            st.markdown(f"**{data.label(org_id)}**")
+        pengaju_q = st.text_input("Nama Anda")
+        kontak_q = st.text_input("Kontak (email / WA)")
+        kolom_q = st.multiselect("Bagian yang ingin diubah", SUGGEST_FIELD_OPTIONS)
 
-                    st.markdown("**Kontak Layanan**")
-                    st.write(safe_str(r.get("Kontak Lembaga/Layanan", "")) or "—")
+        st.markdown("**Opsional – Koordinat Lokasi Lembaga**")
+        lat_col_q, lon_col_q = st.columns(2)
+        with lat_col_q:
+            lat_val_q = st.text_input("Latitude (contoh: -6.1767)")
+        with lon_col_q:
+            lon_val_q = st.text_input("Longitude (contoh: 106.8305)")
 
-                    st.markdown("**Email Layanan**")
-                    st.write(safe_str(r.get("Email Lembaga", "")) or "—")
+        usulan_q = st.text_area(
+            "Tuliskan data baru / koreksi yang diusulkan",
+            height=120,
+        )
 
-                    st.markdown("**Profil Organisasi**")
-                    st.write(safe_str(r.get("Profil Organisasi", "")) or "—")
+        submit_quick = st.form_submit_button("Kirim Usulan Koreksi Cepat")
 
-                with col_b:
-                    st.markdown("**Koordinat Lokasi**")
-                    lat = safe_str(r.get("Latitude", ""))
-                    lon = safe_str(r.get("Longitude", ""))
-                    if lat and lon:
-                        st.write(f"Lat: `{lat}`, Lon: `{lon}`")
-                    else:
-                        st.write(
-                            "Belum ada koordinat latitude/longitude. "
-                            "Dapat diusulkan melalui koreksi data."
-                        )
+        if submit_quick:
+            if not usulan_q.strip() and not (lat_val_q.strip() and lon_val_q.strip()):
+                st.warning(
+                    "Mohon isi perubahan yang diusulkan atau koordinat latitude/longitude."
+                )
+            else:
+                add_suggestion({
+                    "organisasi": data.label(org_id),
+                    "org_id": org_id,
+                    "pengaju": pengaju_q,
+                    "kontak": kontak_q,
+                    "kolom": "; ".join(kolom_q) if kolom_q else "",
+                    "usulan": usulan_q.strip(),
+                    "lat": lat_val_q.strip(),
+                    "lon": lon_val_q.strip(),
+                })
+
+                st.session_state["koreksi_target_id"] = org_id
+                st.success(
+                    "Terima kasih, usulan koreksi Anda sudah tercatat. "
+                    "Admin akan meninjau sebelum mengubah data utama."
+                )
 
-                    st.markdown("**Kategori Layanan**")
-                    kat = r.get("kategori_layanan", [])
-                    if isinstance(kat, (list, tuple)) and kat:
-                        for c in kat:
-                            st.markdown(f"- {c}")
-                    else:
-                        st.write("—")
 
-                st.markdown("**Layanan yang diberikan**")
-                layanan_list = r.get("layanan_list", [])
-                if isinstance(layanan_list, (list, tuple)) and layanan_list:
-                    for item in layanan_list:
-                        st.write(f"- {safe_str(item)}")
-                else:
-                    st.write("—")
+@st.dialog("✏️ Usulan Koreksi Cepat")
+def quick_suggest_dialog(org_id):
+    _quick_suggest_form("dialog_suggest_form", org_id)
 
-                if st.button("Tutup detail", key="close_detail_section"):
-                    st.session_state["show_detail"] = False
-                    st.session_state["detail_org"] = None
-                    st.rerun()
 
-        # ---------- TABEL + DOWNLOAD ----------
-        with st.expander("📋 Tampilkan semua hasil dalam bentuk tabel"):
-            table_df = filtered.copy()
-            cols_table = [
-                c
-                for c in [
-                    "Nama Organisasi",
-                    "Alamat Organisasi",
-                    "Kontak Lembaga/Layanan",
-                    "Email Lembaga",
-                    "kategori_layanan",
-                    "Sumber Data",
-                    "Latitude",
-                    "Longitude",
-                ]
-                if c in table_df.columns
-            ]
-            table_df = table_df[cols_table].copy()
+@st.fragment
+def quick_suggest_section():
+    st.markdown("---")
+    st.markdown(
+        """
+        <h4 id="usulan-koreksi-cepat" style="margin-top:0.5rem;">
+          ✏️ Usulan Koreksi Cepat
+          <a href="#usulan-koreksi-cepat" style="text-decoration:none;">↪</a>
+        </h4>
+        """,
+        unsafe_allow_html=True,
+    )
 
-            if "kategori_layanan" in table_df.columns:
-                table_df["kategori_layanan"] = table_df["kategori_layanan"].apply(
-                    lambda x: ", ".join(x)
-                    if isinstance(x, (list, tuple))
-                    else safe_str(x)
-                )
+    st.markdown(
+        """
+        Bagian ini untuk **koreksi cepat** data lembaga mana pun.  
+        Tombol *"Usulkan koreksi"* pada card di atas membuka form yang sama
+        untuk lembaga tersebut.
+        """
+    )
+    _quick_suggest_form("quick_suggest_form")
 
-            table_df = table_df.rename(
-                columns={
-                    "Nama Organisasi": "Organisation Name",
-                    "Alamat Organisasi": "Address",
-                    "Kontak Lembaga/Layanan": "Service Contact",
-                    "Email Lembaga": "Service Email",
-                    "kategori_layanan": "Service Categories",
-                    "Sumber Data": "Source",
-                }
-            )
-            table_df.insert(0, "No", range(1, len(table_df) + 1))
 
-            st.dataframe(table_df, use_container_width=True)
+def page_direktori():
+    # Heading dengan anchor dan ikon link sederhana
+    st.markdown(
+        """
+        <h3 id="direktori-layanan" style="margin-bottom:0.75rem;">
+          📊 Direktori Layanan
+          <a href="#direktori-layanan" style="text-decoration:none;">↪</a>
+        </h3>
+        """,
+        unsafe_allow_html=True,
+    )
 
-            csv_data = table_df.to_csv(index=False).encode("utf-8")
-            st.download_button(
-                "⬇️ Download filtered results (CSV)",
-                data=csv_data,
-                file_name="direktori_layanan129_filtered.csv",
-                mime="text/csv",
-            )
+    fcol1, fcol2 = st.columns([1, 3])
 
-        # ---------- USULAN KOREKSI CEPAT (ANCHOR) ----------
-        st.markdown("---")
-        st.markdown(
-            """
-            <h4 id="usulan-koreksi-cepat" style="margin-top:0.5rem;">
-              ✏️ Usulan Koreksi Cepat
-              <a href="#usulan-koreksi-cepat" style="text-decoration:none;">↪</a>
-            </h4>
-            """,
-            unsafe_allow_html=True,
+    # ---------- FILTER ----------
+    with fcol1:
+        st.markdown("#### 🔎 Filter")
+        name = st.text_input("Cari Nama Organisasi", key="filter_name")
+        addr = st.text_input("Cari Alamat / Daerah", key="filter_addr")
+        fuzzy = st.toggle(
+            "Toleransi salah ketik (nama & alamat)",
+            key="filter_fuzzy",
+            help="Mis. \"Wonosbo\" tetap menemukan Wonosobo; hasil diurutkan menurut kemiripan.",
+        )
+        text = st.text_input(
+            "Cari di profil & layanan",
+            key="filter_text",
+            placeholder="mis. rumah aman anak Wonosobo",
         )
+        if bm25_tokens(text):
+            st.caption(f"Hasil diurutkan menurut relevansi ({BM25_TOP_K} teratas).")
 
-        st.markdown(
-            """
-            Bagian ini untuk **koreksi cepat** dari card di atas.  
-            Jika Anda baru saja klik tombol *"Usulkan koreksi"* pada salah satu lembaga,
-            nama lembaga tersebut **sudah otomatis dipilih** di sini.
-            """
+        st.session_state["filter_categories"] = [
+            c for c in st.session_state["filter_categories"] if c in data.categories
+        ]
+        selected_categories = st.multiselect(
+            "Kategori Layanan", data.categories, key="filter_categories"
         )
 
-        org_options_quick = sorted(df["Nama Organisasi"].dropna().unique())
-        default_org_q = st.session_state.get("koreksi_target_org")
-        if default_org_q in org_options_quick:
-            default_index_q = org_options_quick.index(default_org_q)
-        else:
-            default_index_q = 0 if org_options_quick else 0
+        # ---------- TERDEKAT ----------
+        near = None
+        if st.toggle("📍 Cari lembaga terdekat dari suatu titik", key="near_on"):
+            near_lat_col, near_lon_col = st.columns(2)
+            with near_lat_col:
+                near_lat = st.number_input(
+                    "Latitude titik", -90.0, 90.0, format="%.5f", key="near_lat"
+                )
+            with near_lon_col:
+                near_lon = st.number_input(
+                    "Longitude titik", -180.0, 180.0, format="%.5f", key="near_lon"
+                )
+            near_mode = st.radio(
+                "Cara pencarian", ["Terdekat", "Dalam radius"], horizontal=True, key="near_mode"
+            )
+            if near_mode == "Terdekat":
+                near_k = st.number_input("Jumlah lembaga", 1, 100, key="near_k")
+                near = (near_lat, near_lon, "k", int(near_k))
+            else:
+                near_radius = st.slider("Radius (km)", 1, 500, key="near_radius")
+                near = (near_lat, near_lon, "radius", float(near_radius))
+            if not len(data.spatial_index):
+                st.caption("Belum ada lembaga dengan koordinat latitude/longitude.")
 
-        suggestions_df_quick = load_suggestions()
+        st.button("Reset filter", on_click=_reset_filter, use_container_width=True)
 
-        with st.form("quick_suggest_form"):
-            org_name_q = st.selectbox(
-                "Pilih lembaga yang ingin dikoreksi",
-                org_options_quick,
-                index=default_index_q,
-            )
-            pengaju_q = st.text_input("Nama Anda")
-            kontak_q = st.text_input("Kontak (email / WA)")
-            kolom_q = st.multiselect(
-                "Bagian yang ingin diubah",
-                [
-                    "Alamat Organisasi",
-                    "Kontak Lembaga/Layanan",
-                    "Email Lembaga",
-                    "Layanan Yang Diberikan",
-                    "Profil Organisasi",
-                    "Koordinat (Latitude/Longitude)",
-                    "Lainnya",
-                ],
-            )
+    query_key = filter_key(data, name, addr, selected_categories, near, text, fuzzy)
+    filtered_idx = cached_filter(data, name, addr, selected_categories, near, text, fuzzy)
 
-            st.markdown("**Opsional – Koordinat Lokasi Lembaga**")
-            lat_col_q, lon_col_q = st.columns(2)
-            with lat_col_q:
-                lat_val_q = st.text_input("Latitude (contoh: -6.1767)")
-            with lon_col_q:
-                lon_val_q = st.text_input("Longitude (contoh: 106.8305)")
+    # ---------- JUMLAH PER HALAMAN ----------
+    with fcol1:
+        page_size = st.selectbox(
+            "Jumlah lembaga per halaman", PAGE_SIZE_OPTIONS, key="page_size"
+        )
 
-            usulan_q = st.text_area(
-                "Tuliskan data baru / koreksi yang diusulkan",
-                height=120,
-            )
+    # ---------- CARD LIST + DETAIL (fragment) ----------
+    with fcol2:
+        direktori_grid(filtered_idx, page_size, near)
 
-            submit_quick = st.form_submit_button("Kirim Usulan Koreksi Cepat")
+        # ---------- TABEL + DOWNLOAD ----------
+        with st.expander("📋 Tampilkan semua hasil dalam bentuk tabel"):
+            st.dataframe(
+                cached_table(data, query_key, filtered_idx), use_container_width=True
+            )
 
-            if submit_quick:
-                if not usulan_q.strip() and not (lat_val_q.strip() and lon_val_q.strip()):
-                    st.warning(
-                        "Mohon isi perubahan yang diusulkan atau koordinat latitude/longitude."
-                    )
-                else:
-                    new_id = (
-                        1
-                        if suggestions_df_quick.empty
-                        else int(suggestions_df_quick["id"].max()) + 1
+            # File ekspor hanya dibuat kalau diminta (lalu dipakai ulang)
+            exp_col1, exp_col2 = st.columns([2, 1])
+            with exp_col1:
+                export_fmt = st.radio(
+                    "Format unduhan",
+                    list(EXPORT_FORMATS),
+                    horizontal=True,
+                    key="export_fmt",
+                )
+            export_file = export_path(query_key, export_fmt)
+            with exp_col2:
+                if not export_file.exists() and st.button(
+                    "Siapkan file unduhan", key="prepare_export"
+                ):
+                    with st.spinner("Menyiapkan file..."):
+                        export_file = build_export(data, query_key, filtered_idx, export_fmt)
+            if export_file.exists():
+                ext, mime = EXPORT_FORMATS[export_fmt]
+                try:
+                    f = export_file.open("rb")
+                except FileNotFoundError:
+                    # Terhapus di antara exists() dan open() → buat ulang
+                    export_file = build_export(data, query_key, filtered_idx, export_fmt)
+                    f = export_file.open("rb")
+                with f:
+                    st.download_button(
+                        f"⬇️ Download filtered results ({export_fmt})",
+                        data=f,
+                        file_name=f"direktori_layanan129_filtered.{ext}",
+                        mime=mime,
                     )
 
-                    new_row = {
-                        "id": int(new_id),
-                        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-                        "organisasi": org_name_q,
-                        "pengaju": pengaju_q,
-                        "kontak": kontak_q,
-                        "kolom": "; ".join(kolom_q) if kolom_q else "",
-                        "usulan": usulan_q.strip(),
-                        "lat": lat_val_q.strip(),
-                        "lon": lon_val_q.strip(),
-                        "status": "Pending",
-                        "processed_at": "",
-                    }
-                    suggestions_df_quick = pd.concat(
-                        [suggestions_df_quick, pd.DataFrame([new_row])],
-                        ignore_index=True,
-                    )
-                    save_suggestions(suggestions_df_quick)
+        # ---------- USULAN KOREKSI CEPAT (fragment) ----------
+        quick_suggest_section()
 
-                    st.session_state["koreksi_target_org"] = org_name_q
-                    st.success(
-                        "Terima kasih, usulan koreksi Anda sudah tercatat. "
-                        "Admin akan meninjau sebelum mengubah data utama."
-                    )
 
         # ---------- GO UP LINK ----------
         st.markdown(
@@ -878,13 +3299,164 @@ with tab_dir:
         )
 
 # ============================================================
-# TAB: KOREKSI DATA (FORM LENGKAP)
+# HALAMAN: PETA (KLASTER DI SERVER)
+# ============================================================
+def _set_map_view(lat: float, lon: float, zoom: int):
+    zoom = ClusterIndex.zoom_level(zoom)
+    lat = min(85.0, max(-85.0, float(lat)))
+    st.session_state["map_view"] = (lat, (float(lon) + 180) % 360 - 180, zoom)
+
+
+def _pan_map(d_lat: float, d_lon: float):
+    """Geser setengah viewport ke arah (d_lat, d_lon) ∈ {-1, 0, 1}."""
+    lat, lon, zoom = st.session_state["map_view"]
+    lat_lo, lat_hi, lon_lo, lon_hi = map_viewport(lat, lon, zoom)
+    _set_map_view(lat + d_lat * (lat_hi - lat_lo) / 2, lon + d_lon * (lon_hi - lon_lo) / 2, zoom)
+
+
+def _fit_map(lat, lon):
+    """Zoom terbesar yang memuat semua titik (lat, lon)."""
+    if not len(lat):
+        _set_map_view(*MAP_DEFAULT_VIEW)
+        return
+    c_lat, c_lon = (lat.min() + lat.max()) / 2, (lon.min() + lon.max()) / 2
+    for zoom in reversed(MAP_ZOOM_LEVELS):
+        lat_lo, lat_hi, lon_lo, lon_hi = map_viewport(c_lat, c_lon, zoom)
+        if lat_lo <= lat.min() and lat.max() <= lat_hi and lon_lo <= lon.min() and lon.max() <= lon_hi:
+            break
+    _set_map_view(c_lat, c_lon, zoom)
+
+
+def page_peta():
+    st.markdown("### 🗺️ Peta Sebaran Lembaga")
+    st.caption(
+        "Filter nama, alamat, kata kunci, dan kategori dari halaman Direktori ikut diterapkan. "
+        "Lembaga yang berdekatan digabung menjadi satu klaster; perbesar peta "
+        "untuk melihat lembaga satu per satu."
+    )
+
+    name = st.session_state["filter_name"]
+    addr = st.session_state["filter_addr"]
+    selected_categories = st.session_state["filter_categories"]
+    text = st.session_state["filter_text"]
+    fuzzy = st.session_state["filter_fuzzy"]
+    map_key = filter_key(data, name, addr, selected_categories, text=text, fuzzy=fuzzy)
+    map_idx = cached_filter(data, name, addr, selected_categories, text=text, fuzzy=fuzzy)
+    map_lat, map_lon, map_zoom = st.session_state["map_view"]
+
+    all_clusters = cached_clusters(data, map_key, map_idx, map_zoom)
+    view_clusters = ClusterIndex.in_view(all_clusters, map_lat, map_lon, map_zoom)
+
+    # ---------- NAVIGASI ----------
+    nav_cols = st.columns([1, 1, 1, 1, 1, 1, 3])
+    nav_cols[0].button("➕", key="map_zoom_in", on_click=_set_map_view,
+                       args=(map_lat, map_lon, map_zoom + 1),
+                       disabled=map_zoom >= MAP_ZOOM_LEVELS[-1], use_container_width=True)
+    nav_cols[1].button("➖", key="map_zoom_out", on_click=_set_map_view,
+                       args=(map_lat, map_lon, map_zoom - 1),
+                       disabled=map_zoom <= MAP_ZOOM_LEVELS[0], use_container_width=True)
+    for col, (label, d_lat, d_lon) in zip(
+        nav_cols[2:6], [("⬅️", 0, -1), ("⬆️", 1, 0), ("⬇️", -1, 0), ("➡️", 0, 1)]
+    ):
+        col.button(label, key=f"map_pan_{d_lat}_{d_lon}", on_click=_pan_map,
+                   args=(d_lat, d_lon), use_container_width=True)
+    with nav_cols[6]:
+        fit_col, reset_col = st.columns(2)
+        fit_col.button(
+            "Pas ke hasil filter", key="map_fit", on_click=_fit_map,
+            args=(all_clusters["lat"].to_numpy(), all_clusters["lon"].to_numpy()),
+            use_container_width=True,
+        )
+        reset_col.button("Seluruh Indonesia", key="map_reset", on_click=_set_map_view,
+                         args=MAP_DEFAULT_VIEW, use_container_width=True)
+
+    # ---------- PETA ----------
+    names_all = data.column("Nama Organisasi")
+    map_df = view_clusters.assign(
+        radius=8 + 4 * np.sqrt(view_clusters["jumlah"].to_numpy()),
+        teks=view_clusters["jumlah"].map(lambda n: str(n) if n > 1 else ""),
+        label=[
+            f"{n} lembaga" if n > 1 else safe_str(names_all[i])
+            for n, i in zip(view_clusters["jumlah"], view_clusters["baris"])
+        ],
+    )
+    deck = pdk.Deck(
+        layers=[
+            pdk.Layer(
+                "ScatterplotLayer",
+                id="klaster",
+                data=map_df,
+                get_position=["lon", "lat"],
+                get_radius="radius",
+                radius_units="pixels",
+                get_fill_color=[196, 30, 90, 170],
+                get_line_color=[255, 255, 255],
+                line_width_min_pixels=1,
+                stroked=True,
+                pickable=True,
+            ),
+            pdk.Layer(
+                "TextLayer",
+                id="jumlah",
+                data=map_df[map_df["jumlah"] > 1],
+                get_position=["lon", "lat"],
+                get_text="teks",
+                get_size=12,
+                get_color=[255, 255, 255],
+            ),
+        ],
+        # Tampilan dikunci ke viewport server; navigasi lewat tombol di atas
+        views=[pdk.View(type="MapView", controller=False)],
+        initial_view_state=pdk.ViewState(latitude=map_lat, longitude=map_lon, zoom=map_zoom),
+        tooltip={"text": "{label}"},
+        map_style=None,
+    )
+    # Lebar tetap: kalau peta melebar mengikuti container, area di luar
+    # viewport MAP_VIEW_PX terlihat kosong karena klasternya tidak dikirim.
+    map_event = st.pydeck_chart(
+        deck,
+        width=MAP_VIEW_PX[0],
+        height=MAP_VIEW_PX[1],
+        use_container_width=False,
+        on_select="rerun",
+        selection_mode="single-object",
+        key="map_chart",
+    )
+
+    n_map_points = int(all_clusters["jumlah"].sum())
+    st.caption(
+        f"{len(view_clusters)} klaster ({int(view_clusters['jumlah'].sum())} lembaga) di area ini · "
+        f"{n_map_points} dari {len(map_idx)} lembaga hasil filter punya koordinat · zoom {map_zoom}"
+    )
+
+    # ---------- KLASTER TERPILIH ----------
+    picked = (map_event.selection.get("objects") or {}).get("klaster") if map_event else None
+    if picked:
+        obj = picked[0]
+        if obj["jumlah"] > 1:
+            st.markdown(f"**{obj['jumlah']} lembaga** di sekitar titik ini.")
+            st.button(
+                "🔍 Perbesar ke klaster ini",
+                key="map_zoom_cluster",
+                on_click=_set_map_view,
+                args=(obj["lat"], obj["lon"], map_zoom + 2),
+            )
+        else:
+            map_row = int(obj["baris"])
+            st.markdown(data.card_html[map_row], unsafe_allow_html=True)
+            if st.button("👁 Lihat detail di halaman Direktori", key="map_detail"):
+                st.session_state["detail_id"] = data.ids[map_row]
+                st.session_state["show_detail"] = True
+                st.switch_page(PAGE_DIREKTORI)
+
+
+# ============================================================
+# HALAMAN: KOREKSI DATA (FORM LENGKAP)
 # ============================================================
-with tab_koreksi:
+def page_koreksi():
     st.markdown("### ✏️ Form Koreksi Data Lembaga")
 
-    suggestions_df = load_suggestions()
-    total_suggestions = len(suggestions_df)
+    total_suggestions = count_suggestions()
 
     col_info, _ = st.columns([1, 3])
     with col_info:
@@ -899,33 +3471,23 @@ with tab_koreksi:
         """
     )
 
-    org_options = sorted(df["Nama Organisasi"].dropna().unique())
-    default_org = st.session_state.get("koreksi_target_org", None)
+    org_options = data.org_options
+    default_org = st.session_state.get("koreksi_target_id", None)
     if default_org in org_options:
         default_index = org_options.index(default_org)
     else:
         default_index = 0 if org_options else 0
 
     with st.form("suggest_form"):
-        org_name = st.selectbox(
+        org_id = st.selectbox(
             "Pilih lembaga yang ingin dikoreksi",
             org_options,
             index=default_index,
+            format_func=data.label,
         )
         pengaju = st.text_input("Nama Anda")
         kontak = st.text_input("Kontak (email / WA)")
-        kolom = st.multiselect(
-            "Bagian yang ingin diubah",
-            [
-                "Alamat Organisasi",
-                "Kontak Lembaga/Layanan",
-                "Email Lembaga",
-                "Layanan Yang Diberikan",
-                "Profil Organisasi",
-                "Koordinat (Latitude/Longitude)",
-                "Lainnya",
-            ],
-        )
+        kolom = st.multiselect("Bagian yang ingin diubah", SUGGEST_FIELD_OPTIONS)
 
         st.markdown("**Opsional – Koordinat Lokasi Lembaga**")
         lat_col, lon_col = st.columns(2)
@@ -947,37 +3509,136 @@ with tab_koreksi:
                     "Mohon isi perubahan yang diusulkan atau koordinat latitude/longitude."
                 )
             else:
-                suggestions_df = load_suggestions()
-                new_id = 1 if suggestions_df.empty else int(suggestions_df["id"].max()) + 1
-
-                new_row = {
-                    "id": int(new_id),
-                    "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-                    "organisasi": org_name,
+                add_suggestion({
+                    "organisasi": data.label(org_id),
+                    "org_id": org_id,
                     "pengaju": pengaju,
                     "kontak": kontak,
                     "kolom": "; ".join(kolom) if kolom else "",
                     "usulan": usulan.strip(),
                     "lat": lat_val.strip(),
                     "lon": lon_val.strip(),
-                    "status": "Pending",
-                    "processed_at": "",
-                }
-                suggestions_df = pd.concat(
-                    [suggestions_df, pd.DataFrame([new_row])],
-                    ignore_index=True,
-                )
-                save_suggestions(suggestions_df)
-                st.session_state["koreksi_target_org"] = org_name
+                })
+                st.session_state["koreksi_target_id"] = org_id
                 st.success(
                     "Terima kasih, usulan koreksi Anda sudah tercatat. "
                     "Admin akan meninjau sebelum mengubah data utama."
                 )
 
 # ============================================================
-# TAB: ADMIN
+# HALAMAN: ADMIN
 # ============================================================
-with tab_admin:
+def _dedup_pair_box(org_a: str, org_b: str, raw: Direktori):
+    """Dua catatan kandidat duplikat berdampingan (dari data sebelum digabung)."""
+    for col, org_id in zip(st.columns(2), (org_a, org_b)):
+        i = raw.row_of(org_id)
+        with col:
+            if i is None:
+                st.caption(f"`{org_id}` tidak ada lagi di data sumber.")
+                continue
+            r = raw.row(i)
+            st.markdown(
+                f"**{safe_str(r.get('Nama Organisasi', ''))}** "
+                f"{get_source_badge_html(safe_str(r.get('Sumber Data', '')))}",
+                unsafe_allow_html=True,
+            )
+            st.caption(safe_str(r.get("Alamat Organisasi", "")) or "—")
+            st.caption(
+                f"☎ {safe_str(r.get('Kontak Lembaga/Layanan', '')) or '—'} · "
+                f"✉ {safe_str(r.get('Email Lembaga', '')) or '—'}"
+            )
+
+
+def dedup_admin_section():
+    """Antrean kandidat duplikat: gabungkan, tandai bukan duplikat, atau pisahkan lagi."""
+    st.markdown("---")
+    st.markdown("#### 🔗 Kandidat Duplikat Lembaga")
+    counts = dedup_counts()
+    st.caption(
+        f"{counts.get('pending', 0)} menunggu keputusan · "
+        f"{counts.get('auto', 0) + counts.get('merged', 0)} digabung "
+        f"({counts.get('auto', 0)} otomatis, skor ≥ {DEDUP_AUTO_SCORE:.0%}) · "
+        f"{counts.get('separate', 0)} ditandai bukan duplikat"
+    )
+
+    def _split_pair(org_a: str, org_b: str):
+        set_dedup_status(org_a, org_b, "separate")
+        st.session_state["dedup_split"] = (org_a, org_b)
+
+    def _split_component(org_id: str):
+        n = split_dedup_component(org_id)
+        st.session_state["dedup_split"] = None
+        st.session_state["dedup_flash"] = f"{n} pasangan dalam kelompok itu dipisahkan."
+
+    raw = load_data()
+
+    def _pair_label(org_a: str, org_b: str) -> str:
+        return f"{raw.label(org_a) or org_a} ↔ {raw.label(org_b) or org_b}"
+
+    flash = st.session_state.pop("dedup_flash", None)
+    if flash:
+        st.success(flash)
+    split = st.session_state.get("dedup_split")
+    if split:
+        link = dedup_link(*split)
+        if link:
+            st.warning(
+                f"{_pair_label(*split)} sudah ditandai bukan duplikat, tetapi keduanya "
+                "masih tergabung lewat pasangan lain: "
+                + "; ".join(_pair_label(a, b) for a, b in link)
+                + ". Pisahkan pasangan tersebut, atau seluruh kelompoknya sekaligus."
+            )
+            st.button(
+                "Pisahkan seluruh kelompok",
+                key="dedup_split_component",
+                on_click=_split_component,
+                args=(split[0],),
+            )
+        else:
+            st.success(f"{_pair_label(*split)} sudah terpisah.")
+            st.session_state["dedup_split"] = None
+
+    pending = dedup_queue(("pending",))
+    if pending.empty:
+        st.caption("Tidak ada kandidat duplikat yang menunggu keputusan.")
+    for row in pending.to_dict("records"):
+        with st.container(border=True):
+            st.write(f"Skor **{row['score']:.0%}** · {safe_str(row['alasan'])}")
+            _dedup_pair_box(row["org_a"], row["org_b"], raw)
+            d1, d2 = st.columns(2)
+            d1.button(
+                "🔗 Gabungkan",
+                key=f"dedup_merge_{row['org_a']}_{row['org_b']}",
+                on_click=set_dedup_status,
+                args=(row["org_a"], row["org_b"], "merged"),
+                use_container_width=True,
+            )
+            d2.button(
+                "Bukan duplikat",
+                key=f"dedup_separate_{row['org_a']}_{row['org_b']}",
+                on_click=set_dedup_status,
+                args=(row["org_a"], row["org_b"], "separate"),
+                use_container_width=True,
+            )
+
+    merged = dedup_queue(("auto", "merged"), limit=100)
+    if not merged.empty:
+        n_merged = counts.get("auto", 0) + counts.get("merged", 0)
+        with st.expander(f"Pasangan yang sudah digabung ({n_merged})"):
+            for row in merged.to_dict("records"):
+                st.write(
+                    f"{_pair_label(row['org_a'], row['org_b'])} "
+                    f"· skor {row['score']:.0%} ({row['status']})"
+                )
+                st.button(
+                    "Pisahkan",
+                    key=f"dedup_split_{row['org_a']}_{row['org_b']}",
+                    on_click=_split_pair,
+                    args=(row["org_a"], row["org_b"]),
+                )
+
+
+def page_admin():
     st.markdown("### 🗂️ Panel Admin – Review & Approval")
 
     pwd = st.text_input(
@@ -989,19 +3650,139 @@ with tab_admin:
     if pwd != "renolds":
         st.info("Masukkan password yang benar untuk melihat dan mengelola usulan koreksi.")
     else:
-        suggestions_df = load_suggestions()
+        status_counts = suggestion_status_counts()
 
-        if suggestions_df.empty:
+        if not sum(status_counts.values()):
             st.caption("Belum ada usulan koreksi yang tercatat.")
         else:
-            suggestions_df = suggestions_df.sort_values(
-                "timestamp", ascending=False
-            ).reset_index(drop=True)
+            m_pending, m_approved, m_rejected = st.columns(3)
+            m_pending.metric("Usulan Pending", status_counts.get("Pending", 0))
+            m_approved.metric("Approved", status_counts.get("Approved", 0))
+            m_rejected.metric("Rejected", status_counts.get("Rejected", 0))
+
+            # ---------- FILTER ANTREAN (dieksekusi di SQLite) ----------
+            af1, af2, af3 = st.columns(3)
+            with af1:
+                status_filter = st.selectbox(
+                    "Status", ["Pending", "Semua", "Approved", "Rejected"], key="admin_status"
+                )
+            with af2:
+                org_filter = st.selectbox(
+                    "Organisasi", ["Semua", *suggestion_organisations()], key="admin_org"
+                )
+            with af3:
+                date_range = st.date_input(
+                    "Rentang tanggal pengajuan", value=(), key="admin_dates"
+                )
+            date_range = tuple(date_range) if isinstance(date_range, (list, tuple)) else (date_range,)
+            date_from = date_range[0] if len(date_range) > 0 else None
+            date_to = date_range[1] if len(date_range) > 1 else date_from
+
+            admin_filter = (status_filter, org_filter, date_from, date_to)
+            if st.session_state.get("admin_filter") != admin_filter:
+                st.session_state["admin_filter"] = admin_filter
+                st.session_state["admin_page"] = 1
+
+            admin_page = st.session_state.get("admin_page", 1)
+            queue_df, matched = query_suggestions(
+                status=None if status_filter == "Semua" else status_filter,
+                organisasi=None if org_filter == "Semua" else org_filter,
+                date_from=date_from,
+                date_to=date_to,
+                limit=ADMIN_PAGE_SIZE,
+                offset=(admin_page - 1) * ADMIN_PAGE_SIZE,
+            )
+            admin_pages = max(1, math.ceil(matched / ADMIN_PAGE_SIZE))
+            if admin_page > admin_pages:
+                st.session_state["admin_page"] = admin_pages
+                st.rerun()
+
+            st.caption(
+                f"{matched} usulan cocok dengan filter · halaman {admin_page} dari {admin_pages}"
+            )
 
-            pending_count = (suggestions_df["status"] == "Pending").sum()
-            st.metric("Usulan Pending", pending_count)
+            # ---------- AKSI MASSAL (satu transaksi, satu rerun) ----------
+            def _bulk_selected(new_status: str):
+                ids = st.session_state.get("admin_selected") or []
+                n = set_suggestions_status(ids, new_status)
+                st.session_state["admin_selected"] = []
+                st.session_state["admin_flash"] = f"{n} usulan Pending ditandai {new_status}."
+
+            def _bulk_filtered(new_status: str, filters: dict):
+                n = set_pending_status_where(new_status, **filters)
+                st.session_state["admin_selected"] = []
+                st.session_state["admin_flash"] = f"{n} usulan Pending ditandai {new_status}."
+
+            flash = st.session_state.pop("admin_flash", None)
+            if flash:
+                st.success(flash)
+
+            # Hanya usulan Pending yang bisa dipilih untuk aksi massal.
+            page_labels = {
+                int(r["id"]): f"#{int(r['id'])} · {safe_str(r.get('organisasi', ''))}"
+                for r in queue_df.to_dict("records")
+                if safe_str(r.get("status", "")) == "Pending"
+            }
+            st.session_state["admin_selected"] = [
+                i for i in st.session_state.get("admin_selected", []) if i in page_labels
+            ]
+
+            with st.container(border=True):
+                st.markdown("**Aksi massal**")
+                st.multiselect(
+                    "Pilih usulan Pending di halaman ini",
+                    options=list(page_labels),
+                    format_func=page_labels.get,
+                    key="admin_selected",
+                )
+                has_selection = bool(st.session_state.get("admin_selected"))
+                bs1, bs2 = st.columns(2)
+                bs1.button(
+                    "✅ Approve terpilih",
+                    key="bulk_approve",
+                    disabled=not has_selection,
+                    on_click=_bulk_selected,
+                    args=("Approved",),
+                    use_container_width=True,
+                )
+                bs2.button(
+                    "❌ Reject terpilih",
+                    key="bulk_reject",
+                    disabled=not has_selection,
+                    on_click=_bulk_selected,
+                    args=("Rejected",),
+                    use_container_width=True,
+                )
+
+                bulk_filters = {
+                    "organisasi": None if org_filter == "Semua" else org_filter,
+                    "date_from": date_from,
+                    "date_to": date_to,
+                }
+                pending_matched = (
+                    count_suggestions("Pending", **bulk_filters)
+                    if status_filter in ("Pending", "Semua")
+                    else 0
+                )
+                bf1, bf2 = st.columns(2)
+                bf1.button(
+                    f"✅ Approve semua Pending yang cocok filter ({pending_matched})",
+                    key="bulk_approve_filtered",
+                    disabled=not pending_matched,
+                    on_click=_bulk_filtered,
+                    args=("Approved", bulk_filters),
+                    use_container_width=True,
+                )
+                bf2.button(
+                    f"❌ Reject semua Pending yang cocok filter ({pending_matched})",
+                    key="bulk_reject_filtered",
+                    disabled=not pending_matched,
+                    on_click=_bulk_filtered,
+                    args=("Rejected", bulk_filters),
+                    use_container_width=True,
+                )
 
-            for idx, row in suggestions_df.iterrows():
+            for row in queue_df.to_dict("records"):
                 status = safe_str(row.get("status", "Pending"))
                 org = safe_str(row.get("organisasi", ""))
                 pengaju = safe_str(row.get("pengaju", "")) or "—"
@@ -1022,6 +3803,25 @@ with tab_admin:
                         st.write("**Usulan Koordinat:**")
                         st.write(f"Lat: `{lat_s or '-'}`, Lon: `{lon_s or '-'}`")
 
+                    has_org = bool(safe_str(row.get("org_id", "")))
+                    patch = suggestion_patch(row) if has_org else {}
+                    if not has_org:
+                        st.caption(
+                            "Usulan lama tanpa ID lembaga: nama lembaganya tidak ditemukan "
+                            "(atau cocok dengan lebih dari satu lembaga) di direktori, jadi "
+                            "tidak bisa diterapkan otomatis. Approve hanya mencatat keputusan."
+                        )
+                    elif patch:
+                        st.write(
+                            "**Diterapkan ke direktori saat di-approve:** "
+                            + ", ".join(f"`{k}`" for k in patch)
+                        )
+                    else:
+                        st.caption(
+                            "Usulan ini tidak bisa diterapkan otomatis "
+                            "(pilih satu bagian, atau tulis per baris `Nama Bagian: nilai`)."
+                        )
+
                     col_a, col_b, col_c = st.columns([1, 1, 3])
                     current_status = status
 
@@ -1030,11 +3830,7 @@ with tab_admin:
                         key=f"approve_{int(row['id'])}",
                         use_container_width=True,
                     ):
-                        suggestions_df.loc[idx, "status"] = "Approved"
-                        suggestions_df.loc[idx, "processed_at"] = (
-                            datetime.datetime.now(datetime.timezone.utc).isoformat()
-                        )
-                        save_suggestions(suggestions_df)
+                        set_suggestion_status(row["id"], "Approved")
                         st.rerun()
 
                     if col_b.button(
@@ -1042,33 +3838,53 @@ with tab_admin:
                         key=f"reject_{int(row['id'])}",
                         use_container_width=True,
                     ):
-                        suggestions_df.loc[idx, "status"] = "Rejected"
-                        suggestions_df.loc[idx, "processed_at"] = (
-                            datetime.datetime.now(datetime.timezone.utc).isoformat()
-                        )
-                        save_suggestions(suggestions_df)
+                        set_suggestion_status(row["id"], "Rejected")
                         st.rerun()
 
                     col_c.write(f"Status sekarang: **{current_status}**")
 
+            if admin_pages > 1:
+                ap_prev, ap_mid, ap_next = st.columns([1, 2, 1])
+                with ap_prev:
+                    if st.button("◀ Sebelumnya", key="admin_prev", disabled=admin_page <= 1):
+                        st.session_state["admin_page"] = admin_page - 1
+                        st.rerun()
+                with ap_mid:
+                    st.markdown(
+                        f"<div style='text-align:center; padding-top:4px;'>Halaman "
+                        f"<b>{admin_page}</b> dari {admin_pages}</div>",
+                        unsafe_allow_html=True,
+                    )
+                with ap_next:
+                    if st.button(
+                        "Berikutnya ▶", key="admin_next", disabled=admin_page >= admin_pages
+                    ):
+                        st.session_state["admin_page"] = admin_page + 1
+                        st.rerun()
+
             st.markdown("---")
             st.caption(
-                "Catatan: koordinat yang telah di-approve dapat dimasukkan ke kolom "
-                "`Latitude` dan `Longitude` di file utama untuk keperluan peta."
+                "Catatan: koreksi yang di-approve langsung ditampilkan di direktori "
+                "(sebagai lapisan koreksi); file sumber tidak diubah. Untuk memindahkan "
+                "koreksi ke file utama, gunakan CSV usulan di bawah."
             )
 
-            csv_data = suggestions_df.to_csv(index=False).encode("utf-8")
-            st.download_button(
-                "⬇️ Download semua usulan (CSV) untuk diolah offline",
-                data=csv_data,
-                file_name="edit_suggestions_layanan129.csv",
-                mime="text/csv",
-            )
+            # Unduhan semua usulan hanya disiapkan kalau diminta
+            if st.button("Siapkan CSV semua usulan", key="prepare_suggest_csv"):
+                csv_data = read_all_suggestions().to_csv(index=False).encode("utf-8")
+                st.download_button(
+                    "⬇️ Download semua usulan (CSV) untuk diolah offline",
+                    data=csv_data,
+                    file_name="edit_suggestions_layanan129.csv",
+                    mime="text/csv",
+                )
+
+        dedup_admin_section()
 
 # ============================================================
-# TAB: TENTANG
+# HALAMAN: TENTANG
 # ============================================================
-with tab_about:
+def page_tentang():
     st.markdown("### ℹ️ Tentang Direktori Layanan 129")
     st.markdown(
         """
@@ -1088,8 +3904,26 @@ with tab_about:
         - Usulan koreksi dari lembaga.
         - Hasil verifikasi lapangan dan koordinasi jaringan.
         
-        Di masa depan, setelah koordinat lokasi (latitude/longitude) lebih lengkap,
-        akan ditambahkan tampilan **peta interaktif** yang menampilkan sebaran lembaga
-        layanan di seluruh Indonesia.
+        Tab **Peta** menampilkan sebaran lembaga layanan di seluruh Indonesia.
+        Lembaga tanpa koordinat di file sumber ditempatkan di pusat kabupaten/kota
+        atau ibu kota provinsinya, jadi posisinya masih perkiraan sampai koordinat
+        yang lebih tepat diusulkan lewat koreksi data.
         """
     )
+
+
+# ============================================================
+# 8. NAVIGASI
+# ============================================================
+PAGE_DIREKTORI = st.Page(page_direktori, title="Direktori", icon="📊", url_path="direktori", default=True)
+navigation = st.navigation(
+    [
+        PAGE_DIREKTORI,
+        st.Page(page_peta, title="Peta", icon="🗺️", url_path="peta"),
+        st.Page(page_koreksi, title="Koreksi Data", icon="✏️", url_path="koreksi"),
+        st.Page(page_admin, title="Admin", icon="🗂️", url_path="admin"),
+        st.Page(page_tentang, title="Tentang", icon="ℹ️", url_path="tentang"),
+    ],
+    position="top",
+)
+navigation.run()
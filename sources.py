@@ -0,0 +1,319 @@
+"""Registry sumber data direktori + ingestion paralel.
+
+Setiap sumber (CSV jaringan FPL, workbook UPTD PPA, dst.) didaftarkan di
+SOURCE_REGISTRY dengan pola file dan fungsi loader-nya. `ingest()` menjalankan
+satu task per file (paralel di process pool kalau file-nya banyak) lalu
+mengembalikan hasil per file beserta waktu dan jumlah baris.
+
+Modul ini sengaja tidak mengimpor streamlit supaya aman dijalankan di worker.
+"""
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+FPL_CSV = BASE_DIR / "fpl database.csv"
+UPTD_XLSX = BASE_DIR / "Data UPTD PPA_2025 (1).xlsx"
+
+# Di bawah jumlah task ini, overhead start process lebih mahal daripada parse-nya.
+PARALLEL_MIN_TASKS = 4
+
+
+# ============================================================
+# LOADER PER JENIS SUMBER
+# ============================================================
+UPTD_HEADER_ROWS = 3  # judul + header + nomor kolom "(1) (2) ..."
+UPTD_SHEETS = {
+    # nama sheet → {indeks kolom: nama kolom}; hanya kolom ini yang dibaca
+    "UPTD PPA Provinsi": {
+        0: "NO",
+        1: "PROVINSI",
+        3: "ALAMAT_KANTOR",
+        4: "TELP_KANTOR",
+        5: "HOTLINE",
+    },
+    "UPTD PPA KabKota": {
+        0: "PROVINSI",
+        2: "KABKOTA",
+        4: "ALAMAT_KANTOR",
+        5: "TELP_KANTOR",
+        6: "HOTLINE",
+    },
+}
+
+
+def _read_uptd_workbook(path: Path) -> dict:
+    """Buka workbook UPTD sekali (read-only) dan stream semua sheet UPTD_SHEETS.
+
+    Hasil: {nama sheet: DataFrame kolom terpetakan}. Kalau workbook tidak bisa
+    dibuka atau ada sheet yang hilang/gagal dibaca, lempar exception: hasil
+    setengah jadi akan menghapus baris UPTD dari direktori, sedangkan
+    `ingest()` menandai file yang gagal (ok=False) supaya baris lamanya dipakai.
+    """
+    if not path.exists():
+        return {}
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ImportError("openpyxl belum diinstall") from e
+
+    try:
+        wb = load_workbook(path, read_only=True, data_only=True)
+    except Exception as e:
+        raise ValueError(f"workbook tidak bisa dibuka ({e})") from e
+
+    frames = {}
+    try:
+        for sheet_name, mapping in UPTD_SHEETS.items():
+            if sheet_name not in wb.sheetnames:
+                raise ValueError(f"sheet '{sheet_name}' tidak ditemukan")
+            try:
+                columns = {name: [] for name in mapping.values()}
+                rows = wb[sheet_name].iter_rows(
+                    min_row=UPTD_HEADER_ROWS + 1,
+                    max_col=max(mapping) + 1,
+                    values_only=True,
+                )
+                for row in rows:
+                    for idx, name in mapping.items():
+                        value = row[idx] if idx < len(row) else None
+                        # samakan dengan pd.read_excel: 85219792650.0 → 85219792650
+                        if isinstance(value, float) and value.is_integer():
+                            value = int(value)
+                        columns[name].append(value)
+                frames[sheet_name] = pd.DataFrame(columns, dtype=object)
+            except Exception as e:
+                raise ValueError(f"sheet '{sheet_name}' gagal dibaca ({e})") from e
+    finally:
+        wb.close()
+
+    return frames
+
+
+def load_fpl(path: Path, warnings: list) -> pd.DataFrame:
+    """Satu file CSV jaringan FPL (separator `;`)."""
+    if not path.exists():
+        return pd.DataFrame()
+
+    df = pd.read_csv(path, sep=";", engine="python")
+
+    if "Kontak Lembaga/\nKontak Layanan" in df.columns:
+        df = df.rename(
+            columns={"Kontak Lembaga/\nKontak Layanan": "Kontak Lembaga/Layanan"}
+        )
+
+    df = df.drop(columns=[c for c in df.columns if c.startswith("Unnamed")], errors="ignore")
+
+    df["Sumber Data"] = "Jaringan FPL"
+    df["Latitude"] = np.nan
+    df["Longitude"] = np.nan
+
+    for col in [
+        "Nama Organisasi",
+        "Alamat Organisasi",
+        "Kontak Lembaga/Layanan",
+        "Email Lembaga",
+        "Profil Organisasi",
+        "Layanan Yang Diberikan",
+        "Provinsi",  # FPL: wilayah dibaca dari alamat saat geocoding
+        "Kabupaten/Kota",
+    ]:
+        if col not in df.columns:
+            df[col] = ""
+
+    return df[
+        [
+            "Nama Organisasi",
+            "Alamat Organisasi",
+            "Kontak Lembaga/Layanan",
+            "Email Lembaga",
+            "Profil Organisasi",
+            "Layanan Yang Diberikan",
+            "Sumber Data",
+            "Latitude",
+            "Longitude",
+            "Provinsi",
+            "Kabupaten/Kota",
+        ]
+    ]
+
+
+def load_uptd_prov(raw) -> pd.DataFrame:
+    """`raw`: sheet "UPTD PPA Provinsi" hasil `_read_uptd_workbook`."""
+    if raw is None:
+        return pd.DataFrame()
+
+    df = raw[raw["PROVINSI"].notna()]
+
+    prov_clean = (
+        df["PROVINSI"]
+        .astype(str)
+        .str.replace(r"^PROVINSI\\s+", "", regex=True)
+        .str.title()
+    )
+
+    out = pd.DataFrame()
+    out["Nama Organisasi"] = "UPTD PPA " + prov_clean
+    out["Alamat Organisasi"] = df["ALAMAT_KANTOR"]
+    out["Kontak Lembaga/Layanan"] = df["HOTLINE"].replace({0: np.nan}).fillna(
+        df["TELP_KANTOR"]
+    )
+    out["Email Lembaga"] = ""
+    out["Profil Organisasi"] = "UPTD PPA tingkat provinsi di Provinsi " + prov_clean
+    out["Layanan Yang Diberikan"] = (
+        "Layanan pengaduan; konseling psikologis; pendampingan hukum; rujukan layanan."
+    )
+    out["Sumber Data"] = "UPTD PPA Provinsi"
+    out["Latitude"] = np.nan
+    out["Longitude"] = np.nan
+    out["Provinsi"] = prov_clean
+    out["Kabupaten/Kota"] = ""
+
+    return out
+
+
+def load_uptd_kabkota(raw) -> pd.DataFrame:
+    """`raw`: sheet "UPTD PPA KabKota" hasil `_read_uptd_workbook`."""
+    if raw is None:
+        return pd.DataFrame()
+
+    df = raw[raw["KABKOTA"].notna()]
+    df = df[df["KABKOTA"] != "(4)"]  # buang baris header nyasar
+
+    prov_clean = (
+        df["PROVINSI"]
+        .astype(str)
+        .str.replace(r"^Provinsi\\s+", "", regex=True)
+        .str.title()
+    )
+    kab_clean = df["KABKOTA"].astype(str).str.title()
+
+    out = pd.DataFrame()
+    out["Nama Organisasi"] = "UPTD PPA " + kab_clean + " (" + prov_clean + ")"
+    out["Alamat Organisasi"] = df["ALAMAT_KANTOR"]
+    out["Kontak Lembaga/Layanan"] = df["HOTLINE"].fillna(df["TELP_KANTOR"])
+    out["Email Lembaga"] = ""
+    out["Profil Organisasi"] = (
+        "UPTD PPA tingkat kabupaten/kota di " + kab_clean + ", Provinsi " + prov_clean
+    )
+    out["Layanan Yang Diberikan"] = (
+        "Layanan pengaduan; konseling psikologis; pendampingan hukum; rujukan layanan."
+    )
+    out["Sumber Data"] = "UPTD PPA Kab/Kota"
+    out["Latitude"] = np.nan
+    out["Longitude"] = np.nan
+    out["Provinsi"] = prov_clean
+    out["Kabupaten/Kota"] = kab_clean
+
+    return out
+
+
+def load_uptd(path: Path, warnings: list) -> pd.DataFrame:
+    """Satu workbook UPTD PPA: sheet Provinsi + Kab/Kota dari sekali buka file."""
+    sheets = _read_uptd_workbook(path)
+    return pd.concat(
+        [
+            load_uptd_prov(sheets.get("UPTD PPA Provinsi")),
+            load_uptd_kabkota(sheets.get("UPTD PPA KabKota")),
+        ],
+        ignore_index=True,
+        sort=False,
+    )
+
+
+# ============================================================
+# REGISTRY & INGESTION
+# ============================================================
+@dataclass(frozen=True)
+class SourceSpec:
+    key: str  # id jenis sumber, mis. "fpl"
+    patterns: tuple  # glob relatif BASE_DIR
+    loader: Callable[[Path, list], pd.DataFrame]
+
+    def paths(self) -> list:
+        found = []
+        for pattern in self.patterns:
+            found.extend(sorted(BASE_DIR.glob(pattern)))
+        return list(dict.fromkeys(found))  # unik, urutan dipertahankan
+
+
+# File tambahan (mis. CSV FPL per provinsi) cukup diletakkan di folder sumber/.
+SOURCE_REGISTRY = [
+    SourceSpec("fpl", (FPL_CSV.name, "sumber/fpl/*.csv"), load_fpl),
+    SourceSpec("uptd", (UPTD_XLSX.name, "sumber/uptd/*.xlsx"), load_uptd),
+]
+
+
+@dataclass
+class SourceResult:
+    key: str
+    path: Path
+    frame: pd.DataFrame
+    seconds: float
+    rows: dict = field(default_factory=dict)  # {Sumber Data: jumlah baris}
+    warnings: list = field(default_factory=list)
+    ok: bool = True  # False kalau loader melempar exception
+
+
+def source_paths(registry=None) -> list:
+    """Semua file sumber yang terdaftar, sebagai (key, path)."""
+    registry = SOURCE_REGISTRY if registry is None else registry
+    return [(spec.key, path) for spec in registry for path in spec.paths()]
+
+
+def _run_task(task) -> SourceResult:
+    key, path = task
+    spec = next(s for s in SOURCE_REGISTRY if s.key == key)
+    warnings = []
+    ok = True
+    start = time.perf_counter()
+    try:
+        frame = spec.loader(path, warnings)
+    except Exception as e:
+        warnings.append(f"Gagal membaca '{path.name}': {e}. Sumber ini dilewati.")
+        frame = pd.DataFrame()
+        ok = False
+    seconds = time.perf_counter() - start
+
+    rows = {}
+    if "Sumber Data" in frame.columns:
+        rows = frame["Sumber Data"].value_counts(sort=False).to_dict()
+    return SourceResult(key, path, frame, seconds, rows, warnings, ok)
+
+
+def ingest(tasks=None, max_workers=None) -> list:
+    """Jalankan loader untuk setiap (key, path); hasil berurutan sesuai `tasks`."""
+    tasks = source_paths() if tasks is None else list(tasks)
+    workers = min(len(tasks), max_workers or os.cpu_count() or 1)
+
+    results = None
+    if len(tasks) >= PARALLEL_MIN_TASKS and workers > 1:
+        try:
+            # spawn: aman dipanggil dari proses streamlit yang multi-thread
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                results = list(pool.map(_run_task, tasks))
+        except Exception as e:
+            logger.warning("Process pool gagal (%s); ingest berurutan.", e)
+    if results is None:
+        results = [_run_task(t) for t in tasks]
+
+    for r in results:
+        logger.info(
+            "sumber %s (%s): %s dalam %.2f dtk",
+            r.key,
+            r.path.name,
+            ", ".join(f"{k}={v}" for k, v in r.rows.items()) or "0 baris",
+            r.seconds,
+        )
+    return results
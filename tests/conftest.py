@@ -0,0 +1,51 @@
+"""Fixture: app.py dijalankan (mode bare streamlit) dari salinan folder di tmp.
+
+Salinan dipakai supaya snapshot, database usulan, dan file sumber yang diubah
+test tidak menyentuh folder repo.
+"""
+import logging
+import runpy
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+import streamlit as st
+
+REPO_DIR = Path(__file__).resolve().parents[1]
+APP_FILES = [
+    "app.py",
+    "sources.py",
+    "fpl database.csv",
+    "Data UPTD PPA_2025 (1).xlsx",
+    "gazetteer_wilayah.csv",
+]
+
+
+def _run_app(folder: Path, monkeypatch) -> dict:
+    for name in APP_FILES:
+        shutil.copy2(REPO_DIR / name, folder / name)
+    monkeypatch.syspath_prepend(str(folder))
+    monkeypatch.delitem(sys.modules, "sources", raising=False)
+    logging.disable(logging.CRITICAL)
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    try:
+        return runpy.run_path(str(folder / "app.py"), run_name="__main__")
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def app_env(tmp_path, monkeypatch):
+    """(namespace modul app, folder salinan) baru untuk test yang mengubah file/DB."""
+    yield _run_app(tmp_path, monkeypatch), tmp_path
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+@pytest.fixture(scope="session")
+def app_ns(tmp_path_factory):
+    """Namespace modul app bersama untuk test yang hanya membaca."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        yield _run_app(tmp_path_factory.mktemp("app"), monkeypatch)
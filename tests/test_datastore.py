@@ -0,0 +1,40 @@
+def _snapshots(base):
+    return {p.name: p.read_bytes() for p in (base / ".snapshot").glob("*.parquet")}
+
+
+def test_corrupt_uptd_workbook_keeps_previous_rows(app_env):
+    ns, base = app_env
+    store = ns["DataStore"]()
+    before = store.current()
+    snapshots = _snapshots(base)
+    assert snapshots
+
+    xlsx = base / "Data UPTD PPA_2025 (1).xlsx"
+    good = xlsx.read_bytes()
+    xlsx.write_bytes(good[: len(good) // 2])  # setengah tersalin
+    store._refresh()
+
+    after = store.current()
+    assert len(after) == len(before)
+    assert after.version == before.version
+    assert (after.column("Sumber Data") == before.column("Sumber Data")).all()
+    assert _snapshots(base) == snapshots
+    assert any("versi sebelumnya" in msg for msg in store.warnings())
+
+    xlsx.write_bytes(good)  # selesai disalin → peringatan hilang
+    store._refresh()
+    assert store.current().version == before.version
+    assert store.warnings() == []
+
+
+def test_corrupt_uptd_workbook_on_first_load_is_not_snapshotted(app_env):
+    ns, base = app_env
+    for path in (base / ".snapshot").glob("*.parquet"):
+        path.unlink()
+    xlsx = base / "Data UPTD PPA_2025 (1).xlsx"
+    xlsx.write_bytes(b"bukan xlsx")
+
+    store = ns["DataStore"]()
+    assert set(store.current().column("Sumber Data")) == {"Jaringan FPL"}
+    assert store.warnings()
+    assert _snapshots(base) == {}
@@ -0,0 +1,39 @@
+import pandas as pd
+
+
+def _with_exact_duplicate(ns, base):
+    """Base + salinan persis baris 0 (ID "X-2") yang datanya lebih lengkap."""
+    frame = base.take(base.all_index())
+    first = frame.iloc[[0]].copy()
+    frame.loc[0, "Email Lembaga"] = ""
+    first["Email Lembaga"] = "salinan@example.org"
+    return ns["Direktori"]("uji", pd.concat([frame, first], ignore_index=True))
+
+
+def test_merged_duplicate_keeps_suffixed_id(app_env):
+    ns, _ = app_env
+    data = _with_exact_duplicate(ns, ns["load_data"]())
+    org_x, org_x2 = data.ids[0], data.ids[-1]
+    assert org_x2 == f"{org_x}-2"
+
+    stage = ns["DedupStage"]()
+    stage.apply(data)
+    ns["set_dedup_status"](org_x, org_x2, "merged")
+    merged = stage.apply(data)
+
+    assert len(merged) == len(data) - 1
+    kept = merged.row_of(org_x2)
+    assert kept is not None
+    assert merged.ids[kept] == org_x2  # baris utama = salinan "-2", ID-nya tidak bergeser
+    assert merged.row_of(org_x) == kept
+    assert merged.row(kept)["Email Lembaga"] == "salinan@example.org"
+
+
+def test_with_aliases_does_not_touch_other_versions(app_env):
+    ns, _ = app_env
+    data = ns["load_data"]()
+    patched = data.with_patches("p", {0: {"Profil Organisasi": "x"}})
+    aliased = patched.with_aliases({"lama": data.ids[0]})
+    assert aliased.row_of("lama") == 0
+    assert patched.row_of("lama") is None
+    assert data.row_of("lama") is None
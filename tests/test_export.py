@@ -0,0 +1,22 @@
+import os
+import time
+
+
+def test_build_export_keeps_recent_exports_of_other_versions(app_env):
+    ns, _ = app_env
+    data = ns["load_data"]()
+    idx = data.all_index()[:10]
+    export_dir = ns["EXPORT_DIR"]
+    export_dir.mkdir(parents=True, exist_ok=True)
+    recent = export_dir / "versilama_0000000000000000.csv"
+    stale = export_dir / "versilama_1111111111111111.csv"
+    recent.write_text("x")
+    stale.write_text("x")
+    old = time.time() - ns["EXPORT_GRACE_SECONDS"] - 60
+    os.utime(stale, (old, old))
+
+    path = ns["build_export"](data, ("uji", data.version), idx, "CSV")
+
+    assert path.exists()
+    assert recent.exists()  # sesi di versi lama mungkin masih membukanya
+    assert not stale.exists()
@@ -0,0 +1,48 @@
+import pytest
+
+REGION_NAMES = [
+    "bengkulu", "bekasi", "semarang", "kalimantan", "selatan", "pekanbaru",
+    "merauke", "ternate", "pesisir", "kediri", "mempawah", "sulawesi",
+]
+
+
+@pytest.fixture
+def stem_id(app_ns):
+    return app_ns["stem_id"]
+
+
+@pytest.mark.parametrize("word", REGION_NAMES)
+def test_region_names_are_not_stemmed(stem_id, word):
+    assert stem_id(word) == word
+
+
+@pytest.mark.parametrize(
+    "word, root",
+    [
+        ("perlindungan", "lindung"),
+        ("melindungi", "lindung"),
+        ("pendampingan", "damping"),
+        ("pelayanan", "layan"),
+        ("perempuan", "perempuan"),
+        ("merdeka", "merdeka"),
+        ("korban", "korban"),
+        ("advokasi", "advokasi"),
+        ("mediasi", "mediasi"),
+        ("rehabilitasi", "rehabilitasi"),
+    ],
+)
+def test_stem_id_keeps_real_roots(stem_id, word, root):
+    assert stem_id(word) == root
+
+
+def test_bm25_region_query_matches_region(app_ns):
+    ns = app_ns
+    data = ns["load_data"]()
+    rows, _ = data.text_index.search("bengkulu")
+    assert len(rows)
+    addresses = [
+        ns["safe_str"](data.column("Alamat Organisasi")[i]).lower()
+        + ns["safe_str"](data.column("Nama Organisasi")[i]).lower()
+        for i in rows
+    ]
+    assert all("bengkulu" in text for text in addresses)
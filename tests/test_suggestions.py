@@ -0,0 +1,34 @@
+def _status_and_corrections(ns, suggestion_id):
+    with ns["suggest_db"]() as conn:
+        status = conn.execute(
+            "SELECT status, processed_at FROM suggestions WHERE id = ?", (suggestion_id,)
+        ).fetchone()
+        corrections = conn.execute(
+            "SELECT org_id, kolom, nilai, applied_at FROM corrections WHERE suggestion_id = ?",
+            (suggestion_id,),
+        ).fetchall()
+    return status, corrections
+
+
+def test_bulk_selected_only_processes_pending(app_env):
+    ns, _ = app_env
+    data = ns["load_data"]()
+    org_ids = data.ids[:2]
+    approved, pending = (
+        ns["add_suggestion"]({
+            "organisasi": data.label(org_id),
+            "org_id": org_id,
+            "kolom": "Alamat Organisasi",
+            "usulan": f"Jl. Uji No. {n}",
+        })
+        for n, org_id in enumerate(org_ids)
+    )
+    ns["set_suggestion_status"](approved, "Approved")
+    before = _status_and_corrections(ns, approved)
+    assert before[0][0] == "Approved" and before[1]
+
+    n = ns["set_suggestions_status"]([approved, pending], "Rejected")
+
+    assert n == 1
+    assert _status_and_corrections(ns, approved) == before
+    assert _status_and_corrections(ns, pending)[0][0] == "Rejected"